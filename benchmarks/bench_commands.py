@@ -0,0 +1,171 @@
+"""Command throughput of the real cogs, driven offline.
+
+Run from the repo root:
+
+    python -m benchmarks.bench_commands --sizes 1000 100000 1000000
+
+For each player count this generates a players.json, loads it through the
+normal PlayerStore and Ledger, adds the Inventory, Progression, Dungeon and
+Combat cogs to a bot that never connects, and calls their commands one at a
+time with fake contexts (see ``benchmarks/fakes.py``). It reports commands
+per second, p50/p99 latency per command and bytes written to players.json
+and the ledger per command.
+
+``--save`` writes the results to ``benchmarks/baseline.json``; later runs
+print the change against that file, and committing it makes regressions
+show up in the diff.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+
+import discord
+from discord.ext import commands
+
+from benchmarks.fakes import FakeChannel, FakeContext, FakeMember, make_players, write_game_data
+from database.ledger import Ledger
+from database.store import JsonBackend, PlayerStore
+from systems.combat import Combat
+from systems.dungeon import Dungeon
+from systems.inventory import Inventory
+from systems.leaderboard import get_leaderboards
+from systems.matchmaking import percentile
+from systems.progression import Progression
+from utils.gamedata import game_data
+from utils.outbox import Outbox
+
+BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+
+# (label, weight, cog, command, args)
+WORKLOAD = (
+    ("inventory", 15, "Inventory", "inventory", ()),
+    ("buy", 15, "Inventory", "buy", ("cheese", 1)),
+    ("sell", 5, "Inventory", "sell", ("cheese", 1)),
+    ("useitem", 10, "Inventory", "useitem", ("cheese",)),
+    ("craft", 5, "Inventory", "craft", ("enchanted_cheese", 1)),
+    ("profile", 15, "Progression", "profile", ()),
+    ("achievements", 5, "Progression", "achievements", ()),
+    ("dungeon", 15, "Dungeon", "dungeon", ("sewers",)),
+    ("fight", 15, "Combat", "fight", ()),
+)
+
+
+class CountingBackend(JsonBackend):
+    """JsonBackend that adds up the size of every file it writes."""
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.bytes_written = 0
+
+    def write(self, updates):
+        super().write(updates)
+        self.bytes_written += os.path.getsize(self.path)
+
+
+async def build_bot(directory, size, rng):
+    path = os.path.join(directory, "players.json")
+    with open(path, 'w') as f:
+        json.dump(make_players(size, rng), f)
+    bot = commands.Bot(command_prefix="$", intents=discord.Intents.none(), help_command=None)
+    bot.player_store = PlayerStore(CountingBackend(path))
+    bot.ledger = Ledger(os.path.join(directory, "ledger"))
+    # No local rate limits: these runs measure the commands, not Discord.
+    bot.outbox = Outbox(limit=0, global_limit=0)
+    await bot.player_store.start()
+    await bot.ledger.start(bot.player_store)
+    for cog in (Inventory, Progression, Dungeon, Combat):
+        await bot.add_cog(cog(bot))
+    # Built when the Leaderboard cog loads in the real bot; !profile reads the rank.
+    get_leaderboards(bot)
+    return bot
+
+
+async def run(size, count, seed):
+    rng = random.Random(seed)
+    random.seed(seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        game_data.data_dir = os.path.join(tmp, "gamedata")
+        write_game_data(game_data.data_dir)
+        load_start = time.perf_counter()
+        bot = await build_bot(tmp, size, rng)
+        load_seconds = time.perf_counter() - load_start
+        store = bot.player_store
+        ids = list(store.load())
+        channel = FakeChannel(rng=rng)
+        labels = [w[0] for w in WORKLOAD]
+        weights = [w[1] for w in WORKLOAD]
+        spec = {w[0]: w for w in WORKLOAD}
+        latencies = {label: [] for label in labels}
+        start = time.perf_counter()
+        for label in rng.choices(labels, weights, k=count):
+            _, _, cog, command, args = spec[label]
+            ctx = FakeContext(bot, FakeMember(rng.choice(ids)), channel)
+            t = time.perf_counter()
+            await getattr(bot.get_cog(cog), command)(ctx, *args)
+            latencies[label].append(time.perf_counter() - t)
+        elapsed = time.perf_counter() - start
+        await bot.outbox.close()
+        await bot.ledger.close()
+        await store.close()
+        store_bytes = store.backend.bytes_written
+        ledger_bytes = bot.ledger.stats.bytes
+    every = [x for values in latencies.values() for x in values]
+    return {
+        "players": size,
+        "commands": count,
+        "load_seconds": round(load_seconds, 2),
+        "commands_per_second": round(count / elapsed, 1),
+        "p50_ms": round(percentile(every, 50) * 1e3, 3),
+        "p99_ms": round(percentile(every, 99) * 1e3, 3),
+        "store_bytes_per_command": round(store_bytes / count),
+        "ledger_bytes_per_command": round(ledger_bytes / count, 1),
+        "api_calls_per_command": round(sum(channel.calls.values()) / count, 2),
+        "per_command": {
+            label: {"n": len(values), "p50_ms": round(percentile(values, 50) * 1e3, 3),
+                    "p99_ms": round(percentile(values, 99) * 1e3, 3)}
+            for label, values in latencies.items() if values
+        },
+    }
+
+
+def change(now, before):
+    return f"{(now - before) / before:+.0%}" if before else "n/a"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 100000, 1000000])
+    parser.add_argument("--commands", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--save", action="store_true", help=f"write the results to {os.path.relpath(BASELINE)}")
+    args = parser.parse_args()
+
+    try:
+        with open(BASELINE, 'r') as f:
+            baseline = {r["players"]: r for r in json.load(f)}
+    except FileNotFoundError:
+        baseline = {}
+
+    results = []
+    print(f"{'players':>10} {'cmd/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'store B/cmd':>12} {'ledger B/cmd':>13} {'vs baseline':>12}")
+    for size in args.sizes:
+        result = asyncio.run(run(size, args.commands, args.seed))
+        results.append(result)
+        before = baseline.get(size)
+        vs = change(result["commands_per_second"], before["commands_per_second"]) if before else ""
+        print(f"{size:>10} {result['commands_per_second']:>9.0f} {result['p50_ms']:>8.3f} {result['p99_ms']:>8.3f} "
+              f"{result['store_bytes_per_command']:>12} {result['ledger_bytes_per_command']:>13} {vs:>12}")
+        for label, stats in result["per_command"].items():
+            print(f"{'':>10} {label:<14} n={stats['n']:<5} p50={stats['p50_ms']:.3f} ms p99={stats['p99_ms']:.3f} ms")
+    if args.save:
+        with open(BASELINE, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Saved baseline to {BASELINE}")
+
+
+if __name__ == "__main__":
+    main()
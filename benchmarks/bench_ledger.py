@@ -0,0 +1,46 @@
+"""Cost of recording one purchase in the economy ledger.
+
+    python -m benchmarks.bench_ledger --entries 100000
+
+Reports the event-loop cost of ``Ledger.record`` per entry and the
+amortised background cost (write + batched fsync) per entry, to compare
+with the whole-file rewrite measured by ``benchmarks.bench_store``.
+"""
+import argparse
+import asyncio
+import tempfile
+import time
+
+from database.ledger import Ledger
+from database.store import JsonBackend, PlayerStore
+
+
+async def run(entries, fsync_interval):
+    with tempfile.TemporaryDirectory() as tmp:
+        store = PlayerStore(JsonBackend(f"{tmp}/players.json"))
+        ledger = Ledger(f"{tmp}/ledger", fsync_interval=fsync_interval, compact_entries=entries * 2)
+        await ledger.start(store)
+        start = time.perf_counter()
+        for i in range(entries):
+            ledger.record("buy", {str(i % 1000): (-10, {"cheese": 1})})
+            if i % 1000 == 0:
+                await asyncio.sleep(0)
+        record = time.perf_counter() - start
+        await ledger.close()
+        total = time.perf_counter() - start
+        return record / entries, total / entries, ledger.stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, default=100000)
+    parser.add_argument("--fsync-interval", type=float, default=0.1)
+    args = parser.parse_args()
+    record, total, stats = asyncio.run(run(args.entries, args.fsync_interval))
+    print(f"record() on the loop: {record * 1e6:.2f} us/entry")
+    print(f"end to end incl. fsync: {total * 1e6:.2f} us/entry")
+    print(f"{stats.entries} entries, {stats.fsyncs} fsyncs, {stats.bytes / stats.entries:.1f} bytes/entry")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Resident memory of player records: JSON dicts vs slotted ``Player`` objects.
+
+Run from the repo root:
+
+    python -m benchmarks.bench_memory --sizes 100000 1000000
+
+For each player count this builds the records exactly as the JSON backend
+does -- one ``json.loads`` of the whole file, then ``Player.from_json`` for
+the slotted column -- and reports the traced allocation size per record.
+"""
+import argparse
+import gc
+import json
+import random
+import tracemalloc
+
+from database.player import Player
+
+ITEMS = ["cheese", "camembert", "magic_dust", "miraculous_ring", "enchanted_cheese", "health_potion"]
+ACHIEVEMENTS = ["first_blood", "cheese_lover", "dungeon_crawler"]
+
+
+def make_file(count, rng):
+    """JSON text of ``count`` players with a realistic spread of fields."""
+    players = {}
+    for i in range(count):
+        record = {
+            "name": f"player{i}",
+            "class": rng.choice(["Unassigned", "Warrior", "Mage", "Rogue"]),
+            "level": rng.randint(1, 50),
+            "xp": rng.randint(0, 5000),
+            "hp": 100,
+            "max_hp": 100,
+            "gold": rng.randint(0, 10000),
+            "inventory": {item: rng.randint(1, 20) for item in rng.sample(ITEMS, rng.randint(0, 4))},
+            "skills": [],
+        }
+        if rng.random() < 0.3:
+            record["achievements"] = rng.sample(ACHIEVEMENTS, rng.randint(1, 3))
+        players[str(100000000000000000 + i)] = record
+    return json.dumps(players)
+
+
+def measure(build):
+    gc.collect()
+    tracemalloc.start()
+    records = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return records, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100000, 1000000])
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    print(f"{'players':>10} {'dict total':>12} {'dict/rec':>10} {'slots total':>12} {'slots/rec':>10} {'saved':>7}")
+    for size in args.sizes:
+        text = make_file(size, random.Random(args.seed))
+        dicts, dict_bytes = measure(lambda: json.loads(text))
+        del dicts
+        slotted, slot_bytes = measure(lambda: {uid: Player.from_json(r) for uid, r in json.loads(text).items()})
+        del slotted
+        print(f"{size:>10} {dict_bytes / 2**20:>9.1f} MB {dict_bytes / size:>8.0f} B "
+              f"{slot_bytes / 2**20:>9.1f} MB {slot_bytes / size:>8.0f} B {1 - slot_bytes / dict_bytes:>6.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Per-command storage cost: whole-file JSON reload vs the shared PlayerStore.
+
+Run from the repo root:
+
+    python -m benchmarks.bench_store --sizes 1000 10000 100000
+
+For each player count this simulates a ``!buy`` (read one record, change gold
+and inventory, persist) both the old way -- ``json.load`` + ``json.dump`` of the
+whole file -- and through ``PlayerStore.get`` / ``mark_dirty``. The store
+column should stay flat as the player count grows; the background flush is
+reported separately since it runs once per interval, not once per command.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+
+from database.db import SqliteBackend, migrate
+from database.store import JsonBackend, PlayerStore
+
+
+def make_players(count):
+    return {
+        str(100000000000000000 + i): {
+            "name": f"player{i}",
+            "class": "Unassigned",
+            "level": random.randint(1, 50),
+            "xp": random.randint(0, 5000),
+            "hp": 100,
+            "max_hp": 100,
+            "gold": random.randint(0, 10000),
+            "inventory": {"cheese": random.randint(0, 20)},
+            "skills": [],
+        }
+        for i in range(count)
+    }
+
+
+def buy_legacy(record):
+    inv = record.setdefault("inventory", {})
+    inv["cheese"] = inv.get("cheese", 0) + 1
+    record["gold"] -= 1
+
+
+def buy(player):
+    player.inventory["cheese"] = player.inventory.get("cheese", 0) + 1
+    player.gold -= 1
+
+
+def bench_legacy(path, ids, commands):
+    start = time.perf_counter()
+    for _ in range(commands):
+        with open(path, 'r') as f:
+            players = json.load(f)
+        buy_legacy(players[random.choice(ids)])
+        with open(path, 'w') as f:
+            json.dump(players, f, indent=2)
+    return (time.perf_counter() - start) / commands
+
+
+def bench_store(backend, ids, commands):
+    store = PlayerStore(backend)
+    store.load()
+    start = time.perf_counter()
+    for _ in range(commands):
+        user_id = random.choice(ids)
+        buy(store.get(user_id))
+        store.mark_dirty(user_id)
+    per_command = (time.perf_counter() - start) / commands
+    start = time.perf_counter()
+    asyncio.run(store.flush())
+    backend.close()
+    return per_command, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--commands", type=int, default=5, help="legacy commands per size (each is a full rewrite)")
+    parser.add_argument("--backend", choices=["json", "sqlite"], default="json")
+    args = parser.parse_args()
+
+    print(f"{'players':>10} {'legacy/cmd':>14} {'store/cmd':>14} {'store flush':>14}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            path = os.path.join(tmp, f"players_{size}.json")
+            players = make_players(size)
+            with open(path, 'w') as f:
+                json.dump(players, f, indent=2)
+            ids = list(players)
+            legacy = bench_legacy(path, ids, args.commands)
+            if args.backend == "sqlite":
+                db_path = os.path.join(tmp, f"players_{size}.db")
+                migrate(path, db_path)
+                backend = SqliteBackend(db_path)
+            else:
+                backend = JsonBackend(path)
+            per_command, flush = bench_store(backend, ids, 10000)
+            print(f"{size:>10} {legacy * 1e3:>11.3f} ms {per_command * 1e6:>11.3f} us {flush * 1e3:>11.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
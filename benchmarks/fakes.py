@@ -0,0 +1,186 @@
+"""Offline stand-ins for the discord.py objects the cogs touch.
+
+``FakeContext.send``, ``FakeMessage.edit`` and interaction responses count
+one API call each on their ``FakeChannel``. Like the bot's own contexts,
+``FakeContext.send`` and ``say`` go through the bot's Outbox. Any view they are handed is
+pressed straight away by running the real callback of one of its buttons
+with a ``FakeInteraction`` from the member the view is waiting on (after
+its ``interaction_check``), so ``view.wait()`` returns without a user. A
+channel can be given an async ``transport(kind)`` to simulate network
+latency or rate limits.
+"""
+import json
+import os
+import random
+from collections import Counter
+
+import discord
+
+from utils.outbox import get_outbox
+
+# Minimal game data the benchmarks run against (the shipped tables are empty).
+GAME_DATA = {
+    "items": {
+        "cheese": {"name": "Cheese", "description": "Plagg's favourite.", "price": 5, "type": "consumable",
+                   "effect": {"hp": 10}},
+        "magic_dust": {"name": "Magic Dust", "description": "Sparkly.", "price": 20, "type": "material"},
+        "enchanted_cheese": {"name": "Enchanted Cheese", "description": "Glows a bit.", "price": 60,
+                             "type": "consumable", "effect": {"hp": 50}},
+        "miraculous_ring": {"name": "Miraculous Ring", "description": "Powerful stuff.", "price": 500,
+                            "type": "equipment"},
+    },
+    "classes": {
+        "warrior": {"name": "Warrior", "base_stats": {"hp": 120}},
+        "mage": {"name": "Mage", "base_stats": {"hp": 80}},
+    },
+    "dungeons": {
+        "sewers": {"name": "Paris Sewers", "description": "Damp and cheesy.", "rooms": 3, "scaling": 0.25,
+                   "enemies": [{"name": "Rat", "weight": 5, "hp": 20, "damage": [2, 5]},
+                               {"name": "Sewer Slime", "weight": 3, "hp": 35, "damage": [4, 8]},
+                               {"name": "Akuma Rat", "weight": 1, "hp": 60, "damage": [8, 14]}],
+                   "gold": [3, 8],
+                   "loot": [{"item": "cheese", "weight": 6, "qty": [1, 2]}, {"item": "magic_dust", "weight": 3},
+                            {"item": "enchanted_cheese", "weight": 1}]},
+    },
+    "recipes": {"enchanted_cheese": {"cheese": 2, "magic_dust": 1}},
+    "achievements": {
+        "first_blood": {"name": "First Blood", "description": "Win a fight.", "trigger": {"event": "fight_won"}},
+        "cheese_lover": {"name": "Cheese Lover", "description": "Eat 10 cheese.",
+                         "trigger": {"event": "item_used", "match": {"item": "cheese"},
+                                     "counter": "cheese_eaten", "threshold": 10}},
+        "dungeon_crawler": {"name": "Dungeon Crawler", "description": "Clear a dungeon.",
+                            "trigger": {"event": "dungeon_cleared"}},
+    },
+    "titles": {},
+    "skills": {},
+}
+
+
+def write_game_data(directory):
+    os.makedirs(directory, exist_ok=True)
+    for name, table in GAME_DATA.items():
+        with open(os.path.join(directory, f"{name}.json"), 'w') as f:
+            json.dump(table, f)
+
+
+def make_players(count, rng=random):
+    """``count`` player records in the players.json shape, keyed like Discord ids."""
+    return {
+        str(100000000000000000 + i): {
+            "name": f"player{i}",
+            "class": rng.choice(["Unassigned", "Warrior", "Mage"]),
+            "level": rng.randint(1, 50),
+            "xp": rng.randint(0, 5000),
+            "hp": 100,
+            "max_hp": 100,
+            "gold": rng.randint(0, 10000),
+            "inventory": {"cheese": rng.randint(0, 20), "magic_dust": rng.randint(0, 5)},
+            "skills": [],
+        }
+        for i in range(count)
+    }
+
+
+class FakeMember:
+    def __init__(self, user_id, name=None):
+        self.id = int(user_id)
+        self.name = self.display_name = name or f"user{user_id}"
+        self.mention = f"<@{self.id}>"
+        self.bot = False
+
+    def __eq__(self, other):
+        return isinstance(other, FakeMember) and other.id == self.id
+
+    def __hash__(self):
+        return hash(self.id)
+
+
+class FakeChannel:
+    """Counts the API calls made through it and optionally delays them via ``transport``."""
+
+    def __init__(self, transport=None, rng=None, channel_id=1):
+        self.id = channel_id
+        self.transport = transport
+        self.rng = rng or random.Random()
+        self.calls = Counter()
+
+    async def call(self, kind, view=None, message=None):
+        self.calls[kind] += 1
+        if self.transport is not None:
+            await self.transport(kind)
+        await self.press(view, message)
+
+    async def press(self, view, message):
+        """Click a random button on ``view``, once per view."""
+        if not isinstance(view, discord.ui.View) or getattr(view, "_fake_pressed", False):
+            return
+        buttons = [child for child in view.children if isinstance(child, discord.ui.Button)]
+        if not buttons:
+            return
+        view._fake_pressed = True
+        # Press as whoever the view is waiting on, and check it the way discord.py does.
+        user = getattr(view, "actor", None) or getattr(view, "opponent", None) or FakeMember(0)
+        interaction = FakeInteraction(self, message, user)
+        if await view.interaction_check(interaction):
+            await self.rng.choice(buttons).callback(interaction)
+
+
+class FakeMessage:
+    def __init__(self, channel, content=None, **kwargs):
+        self.channel = channel
+        self.content = content
+        self.embed = kwargs.get("embed")
+
+    async def edit(self, **kwargs):
+        self.content = kwargs.get("content", self.content)
+        await self.channel.call("edit", kwargs.get("view"), self)
+        return self
+
+
+class FakeResponse:
+    def __init__(self, channel, message):
+        self.channel = channel
+        self.message = message
+        self._done = False
+
+    def is_done(self):
+        return self._done
+
+    async def edit_message(self, **kwargs):
+        self._done = True
+        await self.channel.call("interaction", kwargs.get("view"), self.message)
+
+    async def send_message(self, content=None, **kwargs):
+        self._done = True
+        await self.channel.call("interaction", kwargs.get("view"), self.message)
+
+
+class FakeInteraction:
+    def __init__(self, channel, message, user=None):
+        self.channel = channel
+        self.user = user
+        self.message = message
+        self.response = FakeResponse(channel, message)
+
+
+class FakeContext:
+    def __init__(self, bot, author, channel, guild=None):
+        self.bot = bot
+        self.author = author
+        self.channel = channel
+        self.guild = guild
+        self.command = None
+
+    async def _send(self, content=None, **kwargs):
+        message = FakeMessage(self.channel, content, **kwargs)
+        await self.channel.call("send", kwargs.get("view"), message)
+        return message
+
+    async def send(self, content=None, **kwargs):
+        return await get_outbox(self.bot).send(self.channel, self._send, content, **kwargs)
+
+    async def say(self, content):
+        get_outbox(self.bot).say(self.channel, self._send, content)
+
+    async def invoke(self, command, *args, **kwargs):
+        return await command(self, *args, **kwargs)
@@ -0,0 +1,219 @@
+"""Concurrent load test: many simulated users on one event loop.
+
+Run from the repo root:
+
+    python -m benchmarks.load_test --users 1000 --mix fight=3 dungeon=3 buy=4
+
+Every simulated user runs its share of commands back to back, all users at
+once, against the real cogs (set up as in ``benchmarks.bench_commands``).
+Discord is replaced by ``FakeHTTP``: each send/edit waits a configurable
+latency, and per-channel rate limits answer with a 429 and a retry-after
+that the caller sleeps out before retrying, the way discord.py does.
+Messages go through the bot's Outbox with the same limits, so it should
+avoid most of those 429s; ``--no-outbox`` turns its local limits off for
+comparison.
+
+Reported: throughput, latency percentiles, 429 count, event-loop lag, and
+lost updates. Every economy change goes through the ledger, so the initial
+totals plus every recorded delta give each player's expected gold and
+inventory. Players whose in-memory or saved record differs from that have
+lost an update.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+from collections import Counter
+
+from benchmarks.bench_commands import WORKLOAD, build_bot
+from benchmarks.fakes import FakeChannel, FakeContext, FakeMember, write_game_data
+from database.player import Player
+from systems.matchmaking import percentile
+from utils.gamedata import game_data
+from utils.outbox import Outbox
+
+
+class FakeHTTP:
+    """Stand-in for Discord's REST API with latency and per-channel rate limits.
+
+    Sends and edits each have a bucket of ``limit`` calls per ``per`` seconds
+    per channel; interaction responses are not limited.
+    """
+
+    def __init__(self, latency, jitter, limit, per, rng):
+        self.latency = latency
+        self.jitter = jitter
+        self.limit = limit
+        self.per = per
+        self.rng = rng
+        self.requests = 0
+        self.rate_limited = 0
+        self._windows = {}
+
+    def route(self, channel_id):
+        async def transport(kind):
+            await self.request(channel_id, kind)
+        return transport
+
+    def _retry_after(self, channel_id, kind):
+        if not self.limit or kind == "interaction":
+            return None
+        now = time.monotonic()
+        start, used = self._windows.get((channel_id, kind), (now, 0))
+        if now - start >= self.per:
+            start, used = now, 0
+        if used >= self.limit:
+            return start + self.per - now
+        self._windows[channel_id, kind] = (start, used + 1)
+        return None
+
+    async def request(self, channel_id, kind):
+        while True:
+            self.requests += 1
+            await asyncio.sleep(self.latency + self.rng.uniform(0, self.jitter))
+            retry_after = self._retry_after(channel_id, kind)
+            if retry_after is None:
+                return
+            self.rate_limited += 1
+            await asyncio.sleep(retry_after)
+
+
+class LedgerTap:
+    """Adds up every change recorded in the ledger, per player."""
+
+    def __init__(self, ledger):
+        self.gold = Counter()
+        self.items = {}
+        self._record = ledger.record
+        ledger.record = self.record
+
+    def record(self, op, changes):
+        for user_id, (gold, items) in changes.items():
+            self.gold[user_id] += gold
+            inv = self.items.setdefault(user_id, Counter())
+            inv.update(items)
+        self._record(op, changes)
+
+
+def economy(player):
+    return player.gold, {item: qty for item, qty in player.inventory.items() if qty}
+
+
+def lost_updates(initial, tap, players):
+    """User ids whose (gold, inventory) isn't the initial state plus every ledger delta."""
+    lost = []
+    for user_id, (gold, inv) in initial.items():
+        expected = Counter(inv)
+        expected.update(tap.items.get(user_id, {}))
+        expected = {item: qty for item, qty in expected.items() if qty}
+        if economy(players[user_id]) != (gold + tap.gold[user_id], expected):
+            lost.append(user_id)
+    return lost
+
+
+async def monitor_lag(samples, interval=0.01):
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        samples.append(loop.time() - start - interval)
+
+
+async def user(bot, member, channel, plan, latencies, errors):
+    for cog, command, args in plan:
+        ctx = FakeContext(bot, member, channel)
+        start = time.perf_counter()
+        try:
+            await getattr(bot.get_cog(cog), command)(ctx, *args)
+        except Exception as e:
+            errors[f"{command}: {type(e).__name__}"] += 1
+        latencies.append(time.perf_counter() - start)
+
+
+async def run(args):
+    rng = random.Random(args.seed)
+    random.seed(args.seed)
+    spec = {w[0]: w for w in WORKLOAD}
+    mix = dict(args.mix)
+    with tempfile.TemporaryDirectory() as tmp:
+        game_data.data_dir = os.path.join(tmp, "gamedata")
+        write_game_data(game_data.data_dir)
+        bot = await build_bot(tmp, args.players, rng)
+        if not args.no_outbox:
+            bot.outbox = Outbox(args.limit, args.per, global_limit=0)
+        store = bot.player_store
+        tap = LedgerTap(bot.ledger)
+        players = store.load()
+        ids = list(players)
+        initial = {user_id: economy(player) for user_id, player in players.items()}
+        http = FakeHTTP(args.latency_ms / 1e3, args.jitter_ms / 1e3, args.limit, args.per, rng)
+        channels = [FakeChannel(http.route(i), rng, channel_id=i) for i in range(args.channels)]
+
+        labels, weights = list(mix), list(mix.values())
+        tasks, latencies, errors, lag = [], [], Counter(), []
+        lag_task = asyncio.get_running_loop().create_task(monitor_lag(lag))
+        start = time.perf_counter()
+        for i in range(args.users):
+            member = FakeMember(ids[i % len(ids)])
+            plan = [spec[label][2:] for label in rng.choices(labels, weights, k=args.commands_per_user)]
+            tasks.append(user(bot, member, channels[i % len(channels)], plan, latencies, errors))
+        await asyncio.gather(*tasks)
+        await bot.outbox.close(timeout=None)
+        elapsed = time.perf_counter() - start
+        lag_task.cancel()
+
+        lost_memory = lost_updates(initial, tap, players)
+        await bot.ledger.close()
+        await store.close()
+        with open(store.backend.path, 'r') as f:
+            saved = json.load(f)
+        lost_saved = [uid for uid, player in players.items()
+                      if uid not in saved or economy(Player.from_json(saved[uid])) != economy(player)]
+
+    total = len(latencies)
+    print(f"users {args.users}, players {args.players}, channels {args.channels}, "
+          f"mix {' '.join(f'{k}={v}' for k, v in mix.items())}")
+    print(f"commands:     {total} in {elapsed:.2f} s ({total / elapsed:.0f}/s)")
+    print(f"latency ms:   p50 {percentile(latencies, 50) * 1e3:.1f}  p95 {percentile(latencies, 95) * 1e3:.1f}  "
+          f"p99 {percentile(latencies, 99) * 1e3:.1f}  max {max(latencies) * 1e3:.1f}")
+    print(f"API calls:    {http.requests} ({http.rate_limited} answered 429)")
+    print(f"outbox:       {bot.outbox.stats['merged']} sends merged away, {bot.outbox.stats['waited']} calls "
+          f"delayed locally ({bot.outbox.wait_seconds:.1f}s)")
+    print(f"loop lag ms:  p50 {percentile(lag, 50) * 1e3:.2f}  p99 {percentile(lag, 99) * 1e3:.2f}  "
+          f"max {max(lag, default=0) * 1e3:.2f}")
+    print(f"lost updates: {len(lost_memory)} in memory, {len(lost_saved)} not saved")
+    if errors:
+        print("errors:       " + ", ".join(f"{name} x{n}" for name, n in errors.most_common()))
+
+
+def mix_entry(text):
+    name, _, weight = text.partition("=")
+    if name not in {w[0] for w in WORKLOAD}:
+        raise argparse.ArgumentTypeError(f"unknown command {name!r}; choose from {', '.join(w[0] for w in WORKLOAD)}")
+    return name, float(weight or 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--players", type=int, default=None,
+                        help="registered players (default: one per user; fewer makes users share records)")
+    parser.add_argument("--commands-per-user", type=int, default=5)
+    parser.add_argument("--mix", type=mix_entry, nargs="+", default=[("fight", 3), ("dungeon", 3), ("buy", 4)])
+    parser.add_argument("--channels", type=int, default=200)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--jitter-ms", type=float, default=50)
+    parser.add_argument("--limit", type=int, default=5, help="messages per channel per --per seconds (0 = unlimited)")
+    parser.add_argument("--per", type=float, default=5.0)
+    parser.add_argument("--no-outbox", action="store_true", help="send without the Outbox's local rate limits")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    args.players = args.players or args.users
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -2,4 +2,38 @@
 # Insert your Discord bot token below
 TOKEN = "YOUR_DISCORD_BOT_TOKEN"
 
-# Other configuration options can be added here 
\ No newline at end of file
+# Other configuration options can be added here
+
+# Seconds to wait after a change before writing; saves within the window are merged
+FLUSH_INTERVAL = 5
+
+# Player storage backend: "json" (data/players.json) or "sqlite"
+STORAGE_BACKEND = "json"
+# SQLite database path; None uses data/players.db
+SQLITE_PATH = None
+
+# Economy ledger: seconds of appends batched into one fsync, and entries between compactions
+LEDGER_FSYNC_INTERVAL = 0.1
+LEDGER_COMPACT_ENTRIES = 50000
+
+# Command latency / storage / API call instrumentation (see utils/metrics.py).
+# Off costs one attribute check per timed block; on, a Prometheus text file is
+# written every METRICS_INTERVAL seconds.
+METRICS_ENABLED = False
+# Prometheus text file path; None uses data/metrics.prom
+METRICS_FILE = None
+METRICS_INTERVAL = 15
+
+# Sharding: total shard count (None asks Discord for its recommendation).
+# launcher.py splits the shards across WORKERS processes sharing SQLITE_PATH.
+SHARD_COUNT = None
+WORKERS = 2
+# Seconds between worker health reports
+HEALTH_INTERVAL = 15
+
+# Outbound messages (see utils/outbox.py): local copies of Discord's rate limits.
+# Each channel may take OUTBOX_CHANNEL_LIMIT sends (and as many edits) per
+# OUTBOX_CHANNEL_PER seconds; the whole bot OUTBOX_GLOBAL_LIMIT requests per second.
+OUTBOX_CHANNEL_LIMIT = 5
+OUTBOX_CHANNEL_PER = 5.0
+OUTBOX_GLOBAL_LIMIT = 50
@@ -1 +1,185 @@
- 
\ No newline at end of file
+"""SQLite storage backend for player records.
+
+Each player is one row in ``players``; inventory stacks, achievements and
+titles live in their own tables keyed by player so a purchase only rewrites
+the rows for the players it touched. Fields without a dedicated column are
+kept in the ``extra`` JSON column. Rows are converted to and from
+``Player`` objects with the same JSON shape players.json uses.
+
+Import an existing JSON save with:
+
+    python -m database.db migrate --source data/players.json --db data/players.db
+"""
+import argparse
+import json
+import os
+import sqlite3
+
+from database.player import Player
+
+DB_FILE = os.path.join(os.path.dirname(__file__), '../data/players.db')
+
+# Player fields stored as real columns; everything else goes to ``extra``.
+COLUMNS = ("name", "class", "level", "xp", "hp", "max_hp", "gold", "prestige", "active_title")
+# Fields stored in child tables rather than on the player row.
+CHILD_FIELDS = ("inventory", "achievements", "titles")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS players (
+    id TEXT PRIMARY KEY,
+    name TEXT,
+    class TEXT,
+    level INTEGER,
+    xp INTEGER,
+    hp INTEGER,
+    max_hp INTEGER,
+    gold INTEGER,
+    prestige INTEGER,
+    active_title TEXT,
+    extra TEXT NOT NULL DEFAULT '{}'
+);
+CREATE TABLE IF NOT EXISTS inventory (
+    player_id TEXT NOT NULL REFERENCES players(id) ON DELETE CASCADE,
+    item_id TEXT NOT NULL,
+    qty INTEGER NOT NULL,
+    PRIMARY KEY (player_id, item_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS achievements (
+    player_id TEXT NOT NULL REFERENCES players(id) ON DELETE CASCADE,
+    achievement_id TEXT NOT NULL,
+    PRIMARY KEY (player_id, achievement_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS titles (
+    player_id TEXT NOT NULL REFERENCES players(id) ON DELETE CASCADE,
+    title_id TEXT NOT NULL,
+    PRIMARY KEY (player_id, title_id)
+) WITHOUT ROWID;
+"""
+
+UPSERT_PLAYER = (
+    f"INSERT INTO players (id, {', '.join(COLUMNS)}, extra) "
+    f"VALUES ({', '.join('?' * (len(COLUMNS) + 2))}) "
+    f"ON CONFLICT(id) DO UPDATE SET "
+    + ", ".join(f"{col} = excluded.{col}" for col in COLUMNS + ("extra",))
+)
+
+
+def connect(path=DB_FILE):
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def player_rows(user_id, record):
+    """Split a player's JSON record into (player_row, inventory_rows, achievement_rows, title_rows)."""
+    extra = {k: v for k, v in record.items() if k not in COLUMNS and k not in CHILD_FIELDS}
+    player = (user_id, *(record.get(col) for col in COLUMNS), json.dumps(extra, separators=(',', ':')))
+    inventory = [(user_id, item_id, qty) for item_id, qty in record.get("inventory", {}).items()]
+    achievements = [(user_id, aid) for aid in record.get("achievements", [])]
+    titles = [(user_id, tid) for tid in record.get("titles", [])]
+    return player, inventory, achievements, titles
+
+
+class SqliteBackend:
+    """Player storage in a WAL-mode SQLite database.
+
+    ``prepare`` runs on the event loop and only turns the dirty records into
+    row tuples; ``write`` and ``load_all`` do the actual I/O and are meant to
+    run in the store's executor.
+    """
+
+    def __init__(self, path=DB_FILE):
+        self.path = path
+        self._conn = None
+
+    @property
+    def conn(self):
+        if self._conn is None:
+            self._conn = connect(self.path)
+        return self._conn
+
+    def load_all(self):
+        return self._load()
+
+    def load_players(self, user_ids):
+        """Read just ``user_ids``; ids with no row are left out."""
+        players = {}
+        user_ids = list(user_ids)
+        for start in range(0, len(user_ids), 500):
+            chunk = user_ids[start:start + 500]
+            players.update(self._load(chunk))
+        return players
+
+    def _load(self, user_ids=()):
+        where = child = ""
+        if user_ids:
+            marks = ", ".join("?" * len(user_ids))
+            where, child = f"WHERE id IN ({marks})", f"WHERE player_id IN ({marks})"
+        params = tuple(user_ids)
+        players = {}
+        for row in self.conn.execute(f"SELECT id, {', '.join(COLUMNS)}, extra FROM players {where}", params):
+            record = json.loads(row[-1])
+            record.update((col, value) for col, value in zip(COLUMNS, row[1:-1]) if value is not None)
+            record["inventory"] = {}
+            players[row[0]] = record
+        for player_id, item_id, qty in self.conn.execute(f"SELECT player_id, item_id, qty FROM inventory {child}", params):
+            players[player_id]["inventory"][item_id] = qty
+        for player_id, aid in self.conn.execute(f"SELECT player_id, achievement_id FROM achievements {child}", params):
+            players[player_id].setdefault("achievements", []).append(aid)
+        for player_id, tid in self.conn.execute(f"SELECT player_id, title_id FROM titles {child}", params):
+            players[player_id].setdefault("titles", []).append(tid)
+        return {user_id: Player.from_json(record) for user_id, record in players.items()}
+
+    def prepare(self, players, dirty):
+        return [player_rows(user_id, players[user_id].to_json()) for user_id in dirty if user_id in players]
+
+    def write(self, rows):
+        with self.conn:
+            self._write_rows(rows)
+
+    def _write_rows(self, rows):
+        for player, inventory, achievements, titles in rows:
+            user_id = player[0]
+            self.conn.execute(UPSERT_PLAYER, player)
+            self.conn.execute("DELETE FROM inventory WHERE player_id = ?", (user_id,))
+            self.conn.executemany("INSERT INTO inventory (player_id, item_id, qty) VALUES (?, ?, ?)", inventory)
+            self.conn.execute("DELETE FROM achievements WHERE player_id = ?", (user_id,))
+            self.conn.executemany("INSERT INTO achievements (player_id, achievement_id) VALUES (?, ?)", achievements)
+            self.conn.execute("DELETE FROM titles WHERE player_id = ?", (user_id,))
+            self.conn.executemany("INSERT INTO titles (player_id, title_id) VALUES (?, ?)", titles)
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+def migrate(source, db_path=DB_FILE):
+    """Import every player from a players.json file. Returns the number of players imported."""
+    with open(source, 'r') as f:
+        players = json.load(f)
+    backend = SqliteBackend(db_path)
+    try:
+        backend.write([player_rows(user_id, record) for user_id, record in players.items()])
+    finally:
+        backend.close()
+    return len(players)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Plagg Bot player database tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+    mig = sub.add_parser("migrate", help="import an existing players.json")
+    mig.add_argument("--source", default=os.path.join(os.path.dirname(__file__), '../data/players.json'))
+    mig.add_argument("--db", default=DB_FILE)
+    args = parser.parse_args()
+    if args.command == "migrate":
+        count = migrate(args.source, args.db)
+        print(f"Imported {count} players into {args.db}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,299 @@
+"""Append-only ledger of economy changes (gold and inventory).
+
+Every economy mutation is one JSON line ``[seq, unix_time, op, changes]``
+where ``changes`` is ``[[user_id, gold_delta, {item_id: qty_delta}], ...]``.
+Lines are buffered and written with a single fsync per
+``LEDGER_FSYNC_INTERVAL``. Lines go to numbered segment files; the
+compactor closes the current segment and folds closed segments into
+``snapshot.json``. On startup the snapshot is loaded and newer segments are
+replayed, so a player's gold and inventory are always snapshot + later
+deltas, however stale players.json is. Cogs change gold and inventories
+through ``Ledger.apply``, which mutates the players and records the entry
+in one step; any player the replay still has to correct is printed.
+
+Audit one player's history with:
+
+    python -m database.ledger audit <user_id>
+"""
+import argparse
+import asyncio
+import glob
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import config
+from utils.metrics import metrics
+from database.player import Inventory, STARTING_GOLD
+
+LEDGER_DIR = os.path.join(os.path.dirname(__file__), '../data/ledger')
+
+
+def _segment_path(directory, first_seq):
+    return os.path.join(directory, f"segment-{first_seq:012d}.log")
+
+
+def _segments(directory):
+    return sorted(glob.glob(os.path.join(directory, "segment-*.log")))
+
+
+def read_entries(path):
+    """Yield decoded entries from a segment, stopping at a torn final line."""
+    with open(path, 'r') as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                break
+
+
+def apply_changes(economy, changes):
+    """Apply one entry's changes to a ``{user_id: {"gold", "inventory"}}`` mapping."""
+    for user_id, gold, items in changes:
+        state = economy.get(user_id)
+        if state is None:
+            state = economy[user_id] = {"gold": STARTING_GOLD, "inventory": {}}
+        state["gold"] = state.get("gold", STARTING_GOLD) + gold
+        inv = state.setdefault("inventory", {})
+        for item, delta in items.items():
+            qty = inv.get(item, 0) + delta
+            if qty:
+                inv[item] = qty
+            else:
+                inv.pop(item, None)
+
+
+def load_snapshot(directory):
+    try:
+        with open(os.path.join(directory, "snapshot.json"), 'r') as f:
+            snapshot = json.load(f)
+    except FileNotFoundError:
+        return None
+    return snapshot["seq"], snapshot["players"]
+
+
+def write_snapshot(directory, seq, economy):
+    path = os.path.join(directory, "snapshot.json")
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump({"seq": seq, "players": economy}, f, separators=(',', ':'))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class LedgerStats:
+    def __init__(self):
+        self.entries = 0
+        self.fsyncs = 0
+        self.bytes = 0
+        self.compactions = 0
+        self.replayed = 0
+
+
+class Ledger:
+    """Economy ledger shared by the cogs; see the module docstring for the format."""
+
+    def __init__(self, directory=LEDGER_DIR, fsync_interval=None, compact_entries=None):
+        self.directory = directory
+        self.fsync_interval = config.LEDGER_FSYNC_INTERVAL if fsync_interval is None else fsync_interval
+        self.compact_entries = config.LEDGER_COMPACT_ENTRIES if compact_entries is None else compact_entries
+        self.seq = 0
+        self.stats = LedgerStats()
+        self._buffer = []
+        self._buffer_start = 1
+        self._file = None
+        self._since_compaction = 0
+        self._compacting = None
+        self._wake = asyncio.Event()
+        self._task = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ledger")
+
+    @property
+    def started(self):
+        return self._task is not None
+
+    def apply(self, store, op, changes):
+        """Apply an economy change to the players in ``store`` and record it.
+
+        ``changes`` is what ``record`` takes. Cogs change gold and inventories
+        only through here, so the replay in ``recover`` reproduces exactly
+        what they did. The caller still marks the players dirty.
+        """
+        for user_id, (gold, items) in changes.items():
+            player = store.get(user_id)
+            player.gold += gold
+            inv = player.inventory
+            for item, delta in items.items():
+                qty = inv.get(item, 0) + delta
+                if qty:
+                    inv[item] = qty
+                else:
+                    inv.pop(item, None)
+        self.record(op, changes)
+
+    def record(self, op, changes):
+        """Append one economy change: ``changes`` maps user id -> (gold delta, {item: qty delta})."""
+        if not self.started:
+            return
+        self.seq += 1
+        if not self._buffer:
+            self._buffer_start = self.seq
+        rows = [[str(uid), gold, items] for uid, (gold, items) in changes.items()]
+        self._buffer.append(json.dumps([self.seq, int(time.time()), op, rows], separators=(',', ':')))
+        self.stats.entries += 1
+        self._wake.set()
+
+    def recover(self, players, apply=True):
+        """Rebuild gold/inventory from the snapshot and segments. Returns the user ids that changed.
+
+        With ``apply`` False the segments are only scanned to continue the
+        sequence numbers, and ``players`` is left alone.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        snapshot = load_snapshot(self.directory)
+        if snapshot is None and not _segments(self.directory):
+            # First run: the current player data is the baseline.
+            economy = {uid: {"gold": p.gold, "inventory": p.inventory.to_dict()} for uid, p in players.items()}
+            write_snapshot(self.directory, 0, economy)
+            return []
+        seq, economy = snapshot if snapshot is not None else (0, {})
+        for path in _segments(self.directory):
+            for entry in read_entries(path):
+                if entry[0] > seq:
+                    apply_changes(economy, entry[3])
+                    seq = entry[0]
+                    self.stats.replayed += 1
+        self.seq = seq
+        changed = []
+        if not apply:
+            return changed
+        for user_id, state in economy.items():
+            player = players.get(user_id)
+            if player is None:
+                continue
+            if player.gold != state["gold"] or player.inventory != state["inventory"]:
+                # Either players.json missed a save or something changed the economy without the ledger.
+                print(f"Ledger: restoring {user_id}: gold {player.gold} -> {state['gold']}, "
+                      f"inventory {player.inventory.to_dict()} -> {state['inventory']}")
+                player.gold = state["gold"]
+                player.inventory = Inventory(state["inventory"])
+                changed.append(user_id)
+        if changed:
+            print(f"Ledger: restored gold/inventory of {len(changed)} player(s) from the ledger")
+        return changed
+
+    async def start(self, store, apply=True):
+        """Recover economy state into ``store`` and start the background writer.
+
+        Sharded workers pass ``apply=False``: the shared database is the
+        source of truth there and each worker's ledger is an audit log of
+        its own changes only.
+        """
+        if self.started:
+            return
+        loop = asyncio.get_running_loop()
+        changed = await loop.run_in_executor(self._executor, self.recover, store.load(), apply)
+        if changed:
+            store.mark_dirty(*changed)
+        self._task = loop.create_task(self._sync_loop())
+
+    def _write(self, first_seq, lines):
+        if self._file is None:
+            self._file = open(_segment_path(self.directory, first_seq), 'a')
+        data = "\n".join(lines) + "\n"
+        self._file.write(data)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        return len(data)
+
+    def _rotate(self):
+        """Close the current segment; returns the closed segment paths and the last seq in them."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        return _segments(self.directory), self.seq
+
+    def _fold(self, paths, upto):
+        seq, economy = load_snapshot(self.directory) or (0, {})
+        for path in paths:
+            for entry in read_entries(path):
+                if seq < entry[0] <= upto:
+                    apply_changes(economy, entry[3])
+                    seq = entry[0]
+        write_snapshot(self.directory, seq, economy)
+        for path in paths:
+            os.remove(path)
+
+    async def _flush_buffer(self):
+        if not self._buffer:
+            return
+        lines, self._buffer = self._buffer, []
+        with metrics.timer("storage", "ledger_fsync"):
+            written = await asyncio.get_running_loop().run_in_executor(self._executor, self._write, self._buffer_start, lines)
+        self.stats.fsyncs += 1
+        self.stats.bytes += written
+        self._since_compaction += len(lines)
+
+    async def _sync_loop(self):
+        while True:
+            await self._wake.wait()
+            await asyncio.sleep(self.fsync_interval)
+            self._wake.clear()
+            try:
+                await self._flush_buffer()
+                if self._since_compaction >= self.compact_entries and self._compacting is None:
+                    await self.compact()
+            except Exception as e:
+                print(f"Ledger write failed: {e}")
+
+    async def compact(self):
+        """Fold every closed segment into the snapshot without blocking new appends."""
+        await self._flush_buffer()
+        loop = asyncio.get_running_loop()
+        paths, upto = await loop.run_in_executor(self._executor, self._rotate)
+        self._since_compaction = 0
+        self._compacting = loop.run_in_executor(None, self._fold, paths, upto)
+        try:
+            await self._compacting
+            self.stats.compactions += 1
+        finally:
+            self._compacting = None
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self._flush_buffer()
+        if self._compacting is not None:
+            await self._compacting
+        await asyncio.get_running_loop().run_in_executor(self._executor, self._rotate)
+
+
+def get_ledger(bot):
+    """Return the bot's shared Ledger, creating it on first use."""
+    ledger = getattr(bot, 'ledger', None)
+    if ledger is None:
+        ledger = bot.ledger = Ledger()
+    return ledger
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Economy ledger tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+    audit = sub.add_parser("audit", help="print every ledger entry touching a player")
+    audit.add_argument("user_id")
+    audit.add_argument("--dir", default=LEDGER_DIR)
+    args = parser.parse_args()
+    if args.command == "audit":
+        for path in _segments(args.dir):
+            for seq, ts, op, changes in read_entries(path):
+                for user_id, gold, items in changes:
+                    if user_id == args.user_id:
+                        when = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(ts))
+                        print(f"#{seq} {when} {op}: gold {gold:+d} items {items}")
+
+
+if __name__ == "__main__":
+    main()
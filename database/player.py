@@ -0,0 +1,176 @@
+"""Compact in-memory player records.
+
+A ``Player`` is a ``__slots__`` object rather than a dict, so field names are
+not stored per record and missing fields simply take their defaults.
+Inventories keep interned item ids and quantities packed in one int array
+instead of a ``str -> int`` dict per player. Achievement, title and skill ids
+are interned strings held in tuples; an empty tuple is shared by every player
+that has none.
+
+Storage backends still read and write the original players.json shape:
+``Player.from_json`` and ``Player.to_json`` convert between the two.
+"""
+import sys
+from array import array
+from collections.abc import MutableMapping
+
+# Gold a player has before their first economy change.
+STARTING_GOLD = 50
+# PvP rating for players who have never dueled.
+DEFAULT_RATING = 1000
+
+
+class ItemIds:
+    """Interns item names to small ints shared by every inventory."""
+
+    def __init__(self):
+        self._ids = {}
+        self.names = []
+
+    def id_of(self, name):
+        """Return the id for ``name``, assigning the next one if it is new."""
+        item_id = self._ids.get(name)
+        if item_id is None:
+            item_id = self._ids[name] = len(self.names)
+            self.names.append(sys.intern(name))
+        return item_id
+
+    def find(self, name):
+        """Return the id for ``name``, or None if no inventory has ever held it."""
+        return self._ids.get(name)
+
+    def __len__(self):
+        return len(self.names)
+
+
+item_ids = ItemIds()
+
+
+class Inventory(MutableMapping):
+    """Item stacks stored as ``[id, qty, id, qty, ...]`` in a 64-bit int array.
+
+    Behaves like the ``{item_id: qty}`` dict it replaces. Lookups scan the
+    array, which is cheaper than hashing for the handful of stacks a player
+    carries. 64-bit slots keep quantities from overflowing where the dict's
+    ints never could (bulk grants and ledger replays can pass 2**31).
+    """
+
+    __slots__ = ("_stacks",)
+
+    def __init__(self, stacks=None):
+        self._stacks = array("q")
+        if stacks:
+            for item, qty in stacks.items():
+                self[item] = qty
+
+    def _index(self, item):
+        item_id = item_ids.find(item)
+        if item_id is not None:
+            stacks = self._stacks
+            for i in range(0, len(stacks), 2):
+                if stacks[i] == item_id:
+                    return i
+        return -1
+
+    def __getitem__(self, item):
+        i = self._index(item)
+        if i < 0:
+            raise KeyError(item)
+        return self._stacks[i + 1]
+
+    def get(self, item, default=None):
+        i = self._index(item)
+        return default if i < 0 else self._stacks[i + 1]
+
+    def __contains__(self, item):
+        return self._index(item) >= 0
+
+    def __setitem__(self, item, qty):
+        i = self._index(item)
+        if i < 0:
+            self._stacks.extend((item_ids.id_of(item), qty))
+        else:
+            self._stacks[i + 1] = qty
+
+    def __delitem__(self, item):
+        i = self._index(item)
+        if i < 0:
+            raise KeyError(item)
+        del self._stacks[i:i + 2]
+
+    def __iter__(self):
+        names = item_ids.names
+        stacks = self._stacks
+        return (names[stacks[i]] for i in range(0, len(stacks), 2))
+
+    def __len__(self):
+        return len(self._stacks) // 2
+
+    def to_dict(self):
+        names = item_ids.names
+        stacks = self._stacks
+        return {names[stacks[i]]: stacks[i + 1] for i in range(0, len(stacks), 2)}
+
+    def __repr__(self):
+        return f"Inventory({self.to_dict()!r})"
+
+
+def _interned(ids):
+    return tuple(sys.intern(i) for i in ids) if ids else ()
+
+
+class Player:
+    """One player's record. ``player_class`` is the ``"class"`` key in JSON."""
+
+    __slots__ = ("name", "player_class", "level", "xp", "hp", "max_hp", "gold", "prestige", "rating", "guild",
+                 "active_title", "counters", "inventory", "skills", "achievements", "titles", "extra")
+
+    def __init__(self, name="", player_class="Unassigned", level=1, xp=0, hp=100, max_hp=100,
+                 gold=STARTING_GOLD, prestige=0, rating=DEFAULT_RATING, guild=None, active_title=None,
+                 counters=None, inventory=None, skills=(), achievements=(), titles=(), extra=None):
+        self.name = name
+        self.player_class = sys.intern(player_class)
+        self.level = level
+        self.xp = xp
+        self.hp = hp
+        self.max_hp = max_hp
+        self.gold = gold
+        self.prestige = prestige
+        self.rating = rating
+        # Display name of the player's guild (see systems/guild.py), or None.
+        self.guild = sys.intern(guild) if guild else None
+        self.active_title = active_title
+        # Achievement trigger counters (see systems/achievement.py); None until the first one.
+        self.counters = counters or None
+        self.inventory = inventory if isinstance(inventory, Inventory) else Inventory(inventory)
+        self.skills = _interned(skills)
+        self.achievements = _interned(achievements)
+        self.titles = _interned(titles)
+        # Fields this version doesn't know about, kept so they survive a save.
+        self.extra = extra or None
+
+    @classmethod
+    def from_json(cls, record):
+        record = dict(record)
+        if "cheese_eaten" in record:
+            # Saved before achievement counters were generalised.
+            record["counters"] = {**record.get("counters", {}), "cheese_eaten": record.pop("cheese_eaten")}
+        fields = {attr: record.pop(key) for key, attr in JSON_FIELDS if key in record}
+        return cls(**fields, extra=record)
+
+    def to_json(self):
+        record = {key: getattr(self, attr) for key, attr in JSON_FIELDS}
+        record["inventory"] = self.inventory.to_dict()
+        record["counters"] = dict(self.counters or {})
+        for key in ("skills", "achievements", "titles"):
+            record[key] = list(record[key])
+        if self.extra:
+            record.update(self.extra)
+        return record
+
+    def __repr__(self):
+        return f"Player({self.to_json()!r})"
+
+
+# (JSON key, attribute) for every Player field except ``extra``.
+JSON_FIELDS = tuple(("class" if attr == "player_class" else attr, attr) for attr in Player.__slots__[:-1])
@@ -0,0 +1,242 @@
+"""Player storage shared by several worker processes.
+
+In sharded mode (see ``launcher.py``) every worker keeps its own
+``SharedStore`` over the same SQLite database. Three extra tables keep
+them consistent:
+
+* ``leases``: a cross-process lock per player. ``SharedStore.locked``
+  takes the in-process lock, then the lease; it catches up on changes made
+  by other workers before the command runs, and on release writes the
+  player straight through before giving the lease up. Commands for one
+  player are therefore serialised across processes just as they are within
+  one. Leases are renewed while held and expire after ``LEASE_SECONDS``, so
+  a crashed worker cannot hold a player forever.
+* ``changes``: one row per player write, tagged with the writing worker.
+  Each worker polls it and reloads players changed elsewhere, so reads
+  outside a lock (profiles, leaderboards) lag by at most ``POLL_INTERVAL``.
+* ``workers``: health reports, read by the launcher and ``!health``.
+"""
+import asyncio
+import json
+import time
+from contextlib import asynccontextmanager
+
+import config
+from database.db import DB_FILE, SqliteBackend, connect
+from database.store import PlayerStore
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS changes (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    player_id TEXT NOT NULL,
+    worker TEXT NOT NULL,
+    at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS leases (
+    player_id TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    expires REAL NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS workers (
+    worker TEXT PRIMARY KEY,
+    report TEXT NOT NULL,
+    heartbeat REAL NOT NULL
+) WITHOUT ROWID;
+"""
+
+# Seconds a lease lasts without renewal; held leases are renewed every third of this.
+LEASE_SECONDS = 60
+# Seconds between polls of the change log.
+POLL_INTERVAL = 1.0
+# Seconds to wait before retrying a lease held by another worker.
+LEASE_RETRY = 0.05
+# Change log rows older than this are deleted.
+CHANGE_RETENTION = 600
+
+ACQUIRE = """
+INSERT INTO leases (player_id, owner, expires) VALUES (?, ?, ?)
+ON CONFLICT(player_id) DO UPDATE SET owner = excluded.owner, expires = excluded.expires
+WHERE leases.owner = excluded.owner OR leases.expires < ?
+"""
+
+
+class _LeaseBusy(Exception):
+    pass
+
+
+class SharedSqliteBackend(SqliteBackend):
+    """SqliteBackend that logs every write and manages leases and health rows for ``worker``."""
+
+    def __init__(self, worker, path=DB_FILE):
+        super().__init__(path)
+        self.worker = worker
+
+    @property
+    def conn(self):
+        if self._conn is None:
+            self._conn = connect(self.path)
+            self._conn.execute("PRAGMA busy_timeout=5000")
+            self._conn.executescript(SCHEMA)
+        return self._conn
+
+    def write(self, rows):
+        now = time.time()
+        with self.conn:
+            self._write_rows(rows)
+            self.conn.executemany("INSERT INTO changes (player_id, worker, at) VALUES (?, ?, ?)",
+                                  [(player[0], self.worker, now) for player, *_ in rows])
+
+    def last_change(self):
+        return self.conn.execute("SELECT COALESCE(MAX(seq), 0) FROM changes").fetchone()[0]
+
+    def changes_since(self, seq):
+        """Return (latest seq, ids written by other workers after ``seq``)."""
+        changed = set()
+        for seq, player_id, worker in self.conn.execute(
+                "SELECT seq, player_id, worker FROM changes WHERE seq > ? ORDER BY seq", (seq,)):
+            if worker != self.worker:
+                changed.add(player_id)
+        return seq, changed
+
+    def prune_changes(self):
+        with self.conn:
+            self.conn.execute("DELETE FROM changes WHERE at < ?", (time.time() - CHANGE_RETENTION,))
+
+    def acquire(self, user_ids):
+        """Take the leases on every id in ``user_ids``, or none of them. Returns success."""
+        now = time.time()
+        try:
+            with self.conn:
+                for user_id in user_ids:
+                    if self.conn.execute(ACQUIRE, (user_id, self.worker, now + LEASE_SECONDS, now)).rowcount == 0:
+                        raise _LeaseBusy
+        except _LeaseBusy:
+            return False
+        return True
+
+    def renew(self, user_ids):
+        user_ids = list(user_ids)
+        with self.conn:
+            self.conn.execute(f"UPDATE leases SET expires = ? WHERE owner = ? AND player_id IN ({', '.join('?' * len(user_ids))})",
+                              (time.time() + LEASE_SECONDS, self.worker, *user_ids))
+
+    def release(self, user_ids):
+        user_ids = list(user_ids)
+        with self.conn:
+            self.conn.execute(f"DELETE FROM leases WHERE owner = ? AND player_id IN ({', '.join('?' * len(user_ids))})",
+                              (self.worker, *user_ids))
+
+    def release_all(self):
+        with self.conn:
+            self.conn.execute("DELETE FROM leases WHERE owner = ?", (self.worker,))
+
+    def report(self, report):
+        with self.conn:
+            self.conn.execute("INSERT INTO workers (worker, report, heartbeat) VALUES (?, ?, ?) "
+                              "ON CONFLICT(worker) DO UPDATE SET report = excluded.report, heartbeat = excluded.heartbeat",
+                              (self.worker, json.dumps(report), time.time()))
+
+    def workers(self):
+        """``{worker: (report, seconds since its last heartbeat)}`` for every worker that has reported."""
+        now = time.time()
+        return {worker: (json.loads(report), now - heartbeat)
+                for worker, report, heartbeat in self.conn.execute("SELECT worker, report, heartbeat FROM workers")}
+
+
+class SharedStore(PlayerStore):
+    """PlayerStore for one worker of a sharded deployment; see the module docstring."""
+
+    def __init__(self, worker, path=None, flush_interval=None):
+        super().__init__(SharedSqliteBackend(worker, path or config.SQLITE_PATH or DB_FILE), flush_interval)
+        self.worker = worker
+        self.conflicts = 0
+        self._seq = 0
+        self._leased = set()
+        self._stale = set()
+        self._coordinator = None
+
+    def _run(self, func, *args):
+        return asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    @asynccontextmanager
+    async def locked(self, *user_ids):
+        ids = sorted({str(uid) for uid in user_ids})
+        async with self.locks.hold(*ids):
+            while not await self._run(self.backend.acquire, ids):
+                await asyncio.sleep(LEASE_RETRY)
+            self._leased.update(ids)
+            try:
+                await self.poll(holding=ids)
+                yield
+            finally:
+                try:
+                    await self.flush(ids)
+                finally:
+                    self._leased.difference_update(ids)
+                    await self._run(self.backend.release, ids)
+
+    async def poll(self, holding=()):
+        """Reload players that other workers have written since the last poll.
+
+        Players locked by a command in this process are left alone and
+        reloaded when a later ``locked`` lists them in ``holding`` (its own,
+        just-leased ids). Players with unsaved local changes keep them and
+        count as a conflict.
+        """
+        self._seq, changed = await self._run(self.backend.changes_since, self._seq)
+        holding = set(holding)
+        skipped = {uid for uid in changed - holding if self.locks.is_locked(uid)}
+        self._stale |= skipped
+        changed = (changed - skipped) | (self._stale & holding)
+        self._stale -= changed
+        conflicted = changed & self._dirty
+        self.conflicts += len(conflicted)
+        changed -= conflicted
+        if not changed:
+            return
+        fresh = await self._run(self.backend.load_players, changed)
+        players = self.load()
+        for user_id, player in fresh.items():
+            players[user_id] = player
+            self._versions[user_id] = self._versions.get(user_id, 0) + 1
+        if self._listeners:
+            self._notify(fresh)
+
+    async def heartbeat(self, report):
+        await self._run(self.backend.report, report)
+
+    async def workers(self):
+        return await self._run(self.backend.workers)
+
+    async def start(self):
+        if self._players is None:
+            # Read the change log position first so writes made during the load are polled again.
+            self._seq = await self._run(self.backend.last_change)
+            await self._run(self.backend.release_all)
+        await super().start()
+        if self._coordinator is None:
+            self._coordinator = asyncio.get_running_loop().create_task(self._coordinate())
+
+    async def _coordinate(self):
+        last_renew = last_prune = time.monotonic()
+        while True:
+            await asyncio.sleep(POLL_INTERVAL)
+            try:
+                await self.poll()
+                now = time.monotonic()
+                if self._leased and now - last_renew >= LEASE_SECONDS / 3:
+                    await self._run(self.backend.renew, set(self._leased))
+                    last_renew = now
+                if now - last_prune >= CHANGE_RETENTION:
+                    await self._run(self.backend.prune_changes)
+                    last_prune = now
+            except Exception as e:
+                print(f"Shared store sync failed: {e}")
+
+    async def close(self):
+        if self._coordinator is not None:
+            self._coordinator.cancel()
+            self._coordinator = None
+        await self.flush()
+        await self._run(self.backend.release_all)
+        await super().close()
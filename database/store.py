@@ -0,0 +1,254 @@
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import config
+from database.player import Player
+from utils.locks import PlayerLocks
+from utils.metrics import metrics
+
+PLAYERS_FILE = os.path.join(os.path.dirname(__file__), '../data/players.json')
+# Changes at least this large go to a listener's ``batch`` callback, if it has one.
+BATCH_NOTIFY = 64
+
+
+def _encode(record):
+    return json.dumps(record, separators=(',', ':'))
+
+
+class JsonBackend:
+    """The original single-file players.json format.
+
+    Records are parsed into ``Player`` objects on load and converted back to
+    the JSON shape when saved.
+    Each record's JSON text is cached. ``prepare`` re-encodes only the dirty
+    records on the event loop; ``write`` stitches the cached text into the full
+    file on the worker thread and swaps it into place with an atomic rename, so
+    a crash mid-write leaves the previous file intact.
+    """
+
+    def __init__(self, path=PLAYERS_FILE):
+        self.path = path
+        self._encoded = {}
+
+    def load_all(self):
+        try:
+            with open(self.path, 'r') as f:
+                players = json.load(f)
+        except FileNotFoundError:
+            players = {}
+        self._encoded = {user_id: _encode(record) for user_id, record in players.items()}
+        return {user_id: Player.from_json(record) for user_id, record in players.items()}
+
+    def prepare(self, players, dirty):
+        return {user_id: _encode(players[user_id].to_json()) for user_id in dirty if user_id in players}
+
+    def write(self, updates):
+        self._encoded.update(updates)
+        data = "{" + ",".join(f"{json.dumps(user_id)}:{text}" for user_id, text in self._encoded.items()) + "}"
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def close(self):
+        pass
+
+
+class SaveStats:
+    """Counters for the save pipeline."""
+
+    def __init__(self):
+        self.requests = 0
+        self.writes = 0
+        self.records_written = 0
+        self.failures = 0
+        self.last_write_ms = 0.0
+        self.max_write_ms = 0.0
+        self.total_write_ms = 0.0
+
+    @property
+    def coalesced(self):
+        """Save requests that were merged into another write instead of causing their own."""
+        return max(self.requests - self.writes, 0)
+
+    @property
+    def avg_write_ms(self):
+        return self.total_write_ms / self.writes if self.writes else 0.0
+
+    def record_write(self, records, elapsed_ms):
+        self.writes += 1
+        self.records_written += records
+        self.last_write_ms = elapsed_ms
+        self.max_write_ms = max(self.max_write_ms, elapsed_ms)
+        self.total_write_ms += elapsed_ms
+
+
+def open_backend(name=None):
+    """Build the storage backend selected by ``config.STORAGE_BACKEND``."""
+    name = name or config.STORAGE_BACKEND
+    if name == "json":
+        return JsonBackend()
+    if name == "sqlite":
+        from database.db import SqliteBackend
+        return SqliteBackend(config.SQLITE_PATH) if config.SQLITE_PATH else SqliteBackend()
+    raise ValueError(f"Unknown storage backend: {name!r}")
+
+
+class PlayerStore:
+    """Shared in-memory player records with write-behind persistence.
+
+    Players are loaded once from the backend as ``Player`` objects (see
+    ``database/player.py``). Cogs fetch records with ``get``,
+    mutate them in place and call ``mark_dirty``. Each mark is a save request;
+    requests arriving within ``flush_interval`` of the first one are merged
+    into a single write, and anything still dirty is written on ``close``.
+    Backend I/O runs on a single worker thread so the event loop never waits
+    on disk.
+    """
+
+    def __init__(self, backend=None, flush_interval=None):
+        self.backend = backend if backend is not None else open_backend()
+        self.flush_interval = config.FLUSH_INTERVAL if flush_interval is None else flush_interval
+        self._players = None
+        self._dirty = set()
+        self._task = None
+        self._save_requested = asyncio.Event()
+        self.stats = SaveStats()
+        self.locks = PlayerLocks()
+        self._listeners = []
+        self._versions = {}
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="player-store")
+
+    def load(self):
+        if self._players is None:
+            self._players = self.backend.load_all()
+        return self._players
+
+    def get(self, user_id):
+        return self.load().get(str(user_id))
+
+    def __contains__(self, user_id):
+        return str(user_id) in self.load()
+
+    def __len__(self):
+        return len(self.load())
+
+    def items(self):
+        return self.load().items()
+
+    def create(self, user_id, record):
+        user_id = str(user_id)
+        self.load()[user_id] = record
+        self.mark_dirty(user_id)
+        return record
+
+    def locked(self, *user_ids):
+        """Hold the per-player locks for ``user_ids`` across a read-await-write sequence."""
+        return self.locks.hold(*user_ids)
+
+    def version(self, user_id):
+        """Counter that increases every time the player's record is marked dirty."""
+        return self._versions.get(str(user_id), 0)
+
+    def subscribe(self, callback, batch=None):
+        """Call ``callback(user_id, record)`` after every change to a player.
+
+        When ``batch`` is given, changes to BATCH_NOTIFY or more players at
+        once call ``batch({user_id: record})`` instead, so the listener can
+        rebuild in one pass rather than update player by player.
+        """
+        self._listeners.append((callback, batch))
+
+    def _notify(self, changes):
+        for callback, batch in self._listeners:
+            if batch is not None and len(changes) >= BATCH_NOTIFY:
+                batch(changes)
+            else:
+                for user_id, player in changes.items():
+                    callback(user_id, player)
+
+    def notify(self, user_ids):
+        """Tell listeners about changes to ``user_ids`` marked dirty with ``notify=False``."""
+        if self._listeners:
+            players = self.load()
+            self._notify({str(uid): players.get(str(uid)) for uid in user_ids})
+
+    def mark_dirty(self, *user_ids, notify=True):
+        user_ids = [str(uid) for uid in user_ids]
+        self._dirty.update(user_ids)
+        for user_id in user_ids:
+            self._versions[user_id] = self._versions.get(user_id, 0) + 1
+        self.stats.requests += 1
+        self._save_requested.set()
+        if notify and self._listeners:
+            players = self.load()
+            self._notify({user_id: players.get(user_id) for user_id in user_ids})
+
+    @property
+    def dirty_count(self):
+        return len(self._dirty)
+
+    async def flush(self, user_ids=None):
+        """Persist dirty records (only those in ``user_ids`` if given). Returns the number written."""
+        if user_ids is None:
+            dirty, self._dirty = self._dirty, set()
+        else:
+            dirty = self._dirty.intersection(str(uid) for uid in user_ids)
+            self._dirty -= dirty
+        if not dirty:
+            return 0
+        with metrics.timer("storage", "prepare"):
+            payload = self.backend.prepare(self._players, dirty)
+        try:
+            elapsed_ms = await asyncio.get_running_loop().run_in_executor(self._executor, self._timed_write, payload)
+        except Exception:
+            # Keep the records dirty so the next flush retries them.
+            self._dirty |= dirty
+            self.stats.failures += 1
+            raise
+        self.stats.record_write(len(dirty), elapsed_ms)
+        metrics.observe("storage", "write", elapsed_ms / 1000)
+        return len(dirty)
+
+    def _timed_write(self, payload):
+        start = time.perf_counter()
+        self.backend.write(payload)
+        return (time.perf_counter() - start) * 1000
+
+    async def start(self):
+        if self._players is None:
+            loop = asyncio.get_running_loop()
+            with metrics.timer("storage", "load"):
+                self._players = await loop.run_in_executor(self._executor, self.backend.load_all)
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._save_loop())
+
+    async def _save_loop(self):
+        while True:
+            await self._save_requested.wait()
+            await asyncio.sleep(self.flush_interval)
+            self._save_requested.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"Failed to save players: {e}")
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
+        await asyncio.get_running_loop().run_in_executor(self._executor, self.backend.close)
+
+
+def get_store(bot):
+    """Return the bot's shared PlayerStore, creating it on first use."""
+    store = getattr(bot, 'player_store', None)
+    if store is None:
+        store = bot.player_store = PlayerStore()
+    return store
@@ -0,0 +1,123 @@
+"""Run the bot as several worker processes, each owning a range of shards.
+
+    python launcher.py --workers 4 --shards 16
+
+Each worker is a separate process running ``main.create_bot`` as an
+``AutoShardedBot`` over its own contiguous block of shard ids, so command
+handling, JSON work and rendering spread over that many CPU cores. Workers
+share player data through the SQLite database in ``config.SQLITE_PATH``
+(see ``database/shared.py``); import an existing players.json first with
+``python -m database.db migrate``.
+
+The launcher restarts workers that exit and prints every worker's health
+report (shard latencies, guilds, commands handled, heartbeat age) every
+``config.HEALTH_INTERVAL`` seconds.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import signal
+import time
+
+import discord
+
+import config
+from database.db import DB_FILE
+from database.shared import SharedSqliteBackend
+
+# A worker whose last health report is older than this many intervals is flagged.
+STALE_INTERVALS = 3
+
+
+def shard_ranges(shard_count, workers):
+    """Split shard ids 0..shard_count-1 into ``workers`` contiguous, near-equal blocks."""
+    workers = min(workers, shard_count)
+    size, extra = divmod(shard_count, workers)
+    ranges, start = [], 0
+    for i in range(workers):
+        end = start + size + (i < extra)
+        ranges.append(list(range(start, end)))
+        start = end
+    return ranges
+
+
+async def recommended_shards(token):
+    http = discord.http.HTTPClient(asyncio.get_running_loop())
+    try:
+        await http.static_login(token)
+        shards, _, _ = await http.get_bot_gateway()
+        return shards
+    finally:
+        await http.close()
+
+
+def run_worker(worker, shard_ids, shard_count):
+    import main
+    print(f"{worker} (pid {os.getpid()}): shards {shard_ids[0]}-{shard_ids[-1]} of {shard_count}")
+    main.create_bot(worker, shard_ids, shard_count).run(main.TOKEN)
+
+
+def start_worker(ctx, index, shard_ids, shard_count):
+    process = ctx.Process(target=run_worker, args=(f"worker-{index}", shard_ids, shard_count),
+                          name=f"worker-{index}")
+    process.start()
+    return process
+
+
+def print_health(backend, processes):
+    reports = backend.workers()
+    print(time.strftime("%H:%M:%S"), "worker health:")
+    for index, process in enumerate(processes):
+        name = f"worker-{index}"
+        report, age = reports.get(name, ({}, None))
+        if age is None:
+            print(f"  {name}: pid {process.pid}, no report yet")
+            continue
+        latencies = report.get("shards", {}).values()
+        worst = max(latencies, default=0)
+        stale = " STALE" if age > config.HEALTH_INTERVAL * STALE_INTERVALS else ""
+        print(f"  {name}: pid {report.get('pid')}, {len(latencies)} shard(s), worst latency {worst} ms, "
+              f"{report.get('guilds', 0)} guilds, {report.get('commands', 0)} commands, "
+              f"{report.get('dirty', 0)} unsaved, reported {age:.0f}s ago{stale}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run Plagg Bot as sharded worker processes")
+    parser.add_argument("--workers", type=int, default=config.WORKERS)
+    parser.add_argument("--shards", type=int, default=config.SHARD_COUNT,
+                        help="total shard count (default: config.SHARD_COUNT, else Discord's recommendation)")
+    args = parser.parse_args()
+
+    import main as bot_main
+    shard_count = args.shards or asyncio.run(recommended_shards(bot_main.TOKEN))
+    ranges = shard_ranges(shard_count, args.workers)
+    print(f"Launching {len(ranges)} worker(s) for {shard_count} shard(s)")
+
+    ctx = multiprocessing.get_context("spawn")
+    processes = [start_worker(ctx, i, shard_ids, shard_count) for i, shard_ids in enumerate(ranges)]
+    backend = SharedSqliteBackend("launcher", config.SQLITE_PATH or DB_FILE)
+    try:
+        while True:
+            time.sleep(config.HEALTH_INTERVAL)
+            for i, process in enumerate(processes):
+                if not process.is_alive():
+                    print(f"worker-{i} exited with code {process.exitcode}; restarting")
+                    processes[i] = start_worker(ctx, i, ranges[i], shard_count)
+            print_health(backend, processes)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        # SIGINT lets each bot close cleanly and flush unsaved players.
+        for process in processes:
+            if process.is_alive():
+                os.kill(process.pid, signal.SIGINT)
+        for process in processes:
+            process.join(timeout=30)
+            if process.is_alive():
+                process.terminate()
+        backend.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,36 +1,148 @@
+import time
+STARTED = time.perf_counter()
+
+import asyncio
+import json
 import os
 import discord
 from discord.ext import commands
+import config
+from database.store import PlayerStore
+from database.ledger import Ledger, LEDGER_DIR
+from database.shared import SharedStore
+from utils.gamedata import game_data
+from utils.metrics import metrics
+from utils.outbox import Outbox, OutboxContext
 
+IMPORT_SECONDS = time.perf_counter() - STARTED
 TOKEN = os.getenv("DISCORD_TOKEN")
+STARTUP_REPORT = os.path.join(os.path.dirname(__file__), 'data/startup_profile.json')
 intents = discord.Intents.all()
-bot = commands.Bot(command_prefix="$", intents=intents)
 
 # Modular cog loading
 initial_cogs = [
+    "systems.progression",
     "systems.combat",
-    "systems.character",
     "systems.inventory",
-    "systems.economy",
-    "systems.dungeon",
     "systems.shop",
-    "systems.pvp",
-    "systems.admin",
-    "systems.achievement",
+    "systems.dungeon",
+    "systems.leaderboard",
     "systems.guild",
-    "systems.tutorial"
+    "systems.matchmaking",
+    "systems.skilltree",
+    "systems.help",
+    "systems.plagg_core",
+    "systems.admin",
 ]
 
-async def load_cogs():
-    for cog in initial_cogs:
+
+class PlaggBot(commands.AutoShardedBot):
+    """Bot that owns the shared player store and loads every cog once, before connecting.
+
+    Runs every shard it is given (all of them by default) in this process.
+    ``worker`` names a process started by launcher.py; such a bot stores
+    players in the shared database and reports its health there.
+    """
+
+    def __init__(self, player_store=None, ledger=None, worker=None, **kwargs):
+        super().__init__(**kwargs)
+        self.player_store = PlayerStore() if player_store is None else player_store
+        self.ledger = Ledger() if ledger is None else ledger
+        self.worker = worker
+        self.outbox = Outbox()
+        self.commands_handled = 0
+        self._health_task = None
+        self.startup = {"import_seconds": round(IMPORT_SECONDS, 4), "cogs": {}}
+
+    async def _timed_load(self, cog):
+        start = time.perf_counter()
         try:
-            await bot.load_extension(cog)
+            await self.load_extension(cog)
+            error = None
         except Exception as e:
-            print(f"Failed to load cog {cog}: {e}")
+            error = f"{type(e).__name__}: {e}"
+            print(f"Failed to load cog {cog}: {error}")
+        self.startup["cogs"][cog] = {"seconds": round(time.perf_counter() - start, 4), "error": error}
+
+    async def setup_hook(self):
+        if config.METRICS_ENABLED:
+            metrics.install(self)
+        start = time.perf_counter()
+        # Player data and static game data are independent; load both before any cog needs them.
+        await asyncio.gather(self.player_store.start(), asyncio.to_thread(game_data.warm))
+        # Replays economy changes newer than the last snapshot into the loaded players.
+        # Workers share one database, so their ledgers are audit logs only.
+        await self.ledger.start(self.player_store, apply=self.worker is None)
+        self.startup["data_seconds"] = round(time.perf_counter() - start, 4)
+        start = time.perf_counter()
+        # One after another: load_extension imports synchronously, so running loads
+        # concurrently saves nothing and would blur the per-cog timings.
+        for cog in initial_cogs:
+            await self._timed_load(cog)
+        self.startup["cogs_seconds"] = round(time.perf_counter() - start, 4)
+        self.startup["setup_seconds"] = round(time.perf_counter() - STARTED, 4)
+        self.write_startup_report()
+        if self.worker is not None:
+            self._health_task = asyncio.get_running_loop().create_task(self._report_health())
+
+    def health(self):
+        """This process's shard latencies and load, as shown by !health and the launcher."""
+        return {
+            "worker": self.worker or "main",
+            "pid": os.getpid(),
+            "shards": {str(shard_id): round(latency * 1000, 1) for shard_id, latency in self.latencies},
+            "guilds": len(self.guilds),
+            "commands": self.commands_handled,
+            "players": len(self.player_store),
+            "dirty": self.player_store.dirty_count,
+            "queued": self.outbox.depth,
+            "uptime": round(time.perf_counter() - STARTED),
+        }
+
+    async def _report_health(self):
+        while True:
+            try:
+                await self.player_store.heartbeat(self.health())
+            except Exception as e:
+                print(f"Failed to report health: {e}")
+            await asyncio.sleep(config.HEALTH_INTERVAL)
+
+    async def get_context(self, origin, *, cls=OutboxContext):
+        return await super().get_context(origin, cls=cls)
+
+    async def on_command_completion(self, ctx):
+        self.commands_handled += 1
+
+    def write_startup_report(self):
+        path = STARTUP_REPORT if self.worker is None else STARTUP_REPORT.replace(".json", f"-{self.worker}.json")
+        with open(path, 'w') as f:
+            json.dump(self.startup, f, indent=2)
+
+    async def on_ready(self):
+        print(f"Logged in as {self.user} (ID: {self.user.id})")
+        if "ready_seconds" not in self.startup:
+            self.startup["ready_seconds"] = round(time.perf_counter() - STARTED, 4)
+            self.write_startup_report()
+
+    async def close(self):
+        if self._health_task is not None:
+            self._health_task.cancel()
+        await self.outbox.close()
+        await self.ledger.close()
+        await self.player_store.close()
+        await metrics.close()
+        await super().close()
+
+
+def create_bot(worker=None, shard_ids=None, shard_count=None):
+    """Build the bot; ``worker`` is set for processes started by launcher.py."""
+    player_store = ledger = None
+    if worker is not None:
+        player_store = SharedStore(worker)
+        ledger = Ledger(os.path.join(LEDGER_DIR, worker))
+    return PlaggBot(player_store, ledger, worker=worker, command_prefix="$", intents=intents, help_command=None,
+                    shard_ids=shard_ids, shard_count=shard_count or config.SHARD_COUNT)
 
-@bot.event
-async def on_ready():
-    print(f"Logged in as {bot.user} (ID: {bot.user.id})")
-    await load_cogs()
 
-bot.run(TOKEN) 
\ No newline at end of file
+if __name__ == "__main__":
+    create_bot().run(TOKEN)
@@ -1 +1,111 @@
- 
\ No newline at end of file
+"""Achievement rules driven by events.
+
+Each entry in ``data/achievements.json`` may declare a trigger:
+
+    "cheese_lover": {
+        "name": "Cheese Lover", "description": "Eat 10 cheese.",
+        "trigger": {"event": "item_used", "match": {"item": "cheese"},
+                    "counter": "cheese_eaten", "threshold": 10}
+    }
+
+Cogs call ``emit(player, event, **attrs)`` when something happens. Rules
+are indexed by event type, so only the rules for that event are looked at,
+and rules for achievements the player already has are skipped. A matching
+rule bumps its counter (once per event, however many rules share it) and
+awards the achievement when the counter reaches ``threshold``; without a
+counter the first matching event awards it. Titles that require the
+achievement are granted with it.
+
+``emit`` only changes the in-memory record. Call it before the command's
+``mark_dirty`` so the awards are saved in the same flush as the action, and
+pass what it returns to ``announce`` after the command's own reply.
+"""
+from typing import NamedTuple
+from utils.gamedata import game_data
+
+
+class Rule(NamedTuple):
+    achievement_id: str
+    match: dict
+    counter: str
+    threshold: int
+
+
+class AchievementRules:
+    """achievements.json compiled into ``{event type: [Rule]}``."""
+
+    def __init__(self, achievements):
+        self.by_event = {}
+        for achievement_id, achievement in achievements.items():
+            trigger = achievement.get("trigger")
+            if not trigger:
+                continue
+            rule = Rule(achievement_id, trigger.get("match", {}), trigger.get("counter"), trigger.get("threshold", 1))
+            self.by_event.setdefault(trigger["event"], []).append(rule)
+
+    def emit(self, player, event, **attrs):
+        """Apply ``event`` to ``player``; returns the ids of newly awarded achievements."""
+        rules = [rule for rule in self.by_event.get(event, ())
+                 if rule.achievement_id not in player.achievements
+                 and all(attrs.get(k) == v for k, v in rule.match.items())]
+        if not rules:
+            return []
+        counters = {rule.counter for rule in rules if rule.counter}
+        if counters:
+            if player.counters is None:
+                player.counters = {}
+            for counter in counters:
+                player.counters[counter] = player.counters.get(counter, 0) + 1
+        awarded = []
+        for rule in rules:
+            count = player.counters[rule.counter] if rule.counter else 1
+            if count >= rule.threshold and award(player, rule.achievement_id):
+                awarded.append(rule.achievement_id)
+        return awarded
+
+
+def award(player, achievement_id):
+    """Give ``player`` an achievement and the titles it unlocks. Returns False if they had it."""
+    if achievement_id in player.achievements:
+        return False
+    player.achievements += (achievement_id,)
+    for title_id in game_data.titles_for_achievement(achievement_id):
+        if title_id not in player.titles:
+            player.titles += (title_id,)
+    return True
+
+
+_rules = None
+
+
+def _compile(achievements):
+    global _rules
+    _rules = AchievementRules(achievements)
+
+
+game_data.on_reload("achievements", _compile)
+
+
+def get_rules():
+    """Return the rules for the current achievements.json, recompiling after a data reload."""
+    game_data.table("achievements")
+    return _rules
+
+
+def emit(player, event, **attrs):
+    return get_rules().emit(player, event, **attrs)
+
+
+async def announce(ctx, member, awarded):
+    """Tell the channel about ``member``'s new achievements and titles.
+
+    The lines go out through ``ctx.say``, so they don't hold up the command
+    and are merged with any other announcements queued for the channel.
+    """
+    achievements, titles = game_data.achievements, game_data.titles
+    for achievement_id in awarded:
+        line = f"🏆 Plagg: {member.mention} unlocked **{achievements[achievement_id]['name']}**!"
+        names = [titles[t]["name"] for t in game_data.titles_for_achievement(achievement_id) if t in titles]
+        if names:
+            line += f" New title: {', '.join(names)}."
+        await ctx.say(line)
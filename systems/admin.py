@@ -1 +1,224 @@
- 
\ No newline at end of file
+import asyncio
+import time
+import traceback
+from typing import Optional
+from discord.ext import commands
+from database.store import get_store
+from database.ledger import get_ledger
+from database.shared import SharedStore
+from systems.leaderboard import get_leaderboards
+from systems.shop import ItemName
+from utils.gamedata import game_data
+from ui.battle import battle_stats
+from ui.render_cache import render_cache
+from utils.metrics import metrics
+from utils.outbox import get_outbox
+
+# Players processed between yields to the event loop during bulk operations.
+BULK_CHUNK = 2000
+# Minimum seconds between progress message edits.
+PROGRESS_INTERVAL = 2.0
+
+
+class LevelRange(commands.Converter):
+    """``10`` or ``10-20`` as an inclusive ``(low, high)`` level range."""
+
+    async def convert(self, ctx, argument):
+        low, sep, high = argument.partition("-")
+        try:
+            low = int(low)
+            high = int(high) if sep else low
+        except ValueError:
+            raise commands.BadArgument(f"level must be a number or a range like 10-20, not {argument!r}")
+        if low > high:
+            raise commands.BadArgument(f"level range {argument!r} is backwards; try {high}-{low}")
+        return low, high
+
+
+class BulkFilters(commands.FlagConverter):
+    """Player filters for bulk commands, e.g. ``class: Mage level: 10-20 server: yes dry: yes``."""
+    player_class: Optional[str] = commands.flag(name="class", default=None)
+    level: Optional[LevelRange] = commands.flag(default=None)
+    server: bool = commands.flag(default=False)
+    dry: bool = commands.flag(default=False)
+
+
+class Admin(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+        self.store = get_store(bot)
+        self.ledger = get_ledger(bot)
+
+    async def cog_check(self, ctx):
+        return await self.bot.is_owner(ctx.author)
+
+    async def cog_command_error(self, ctx, error):
+        if isinstance(error, commands.BadFlagArgument):
+            error = error.original
+        if isinstance(error, commands.BadArgument):
+            await ctx.send(f"{error}\nUsage: !{ctx.command.qualified_name} {ctx.command.signature}")
+        else:
+            traceback.print_exception(type(error), error, error.__traceback__)
+
+    @commands.command()
+    async def datastats(self, ctx):
+        """Show game-data reload counts and lookup hit rates (owner only)."""
+        await ctx.send(f"**Game Data Cache:**\n```\n{game_data.report()}\n```")
+
+    @commands.command()
+    async def renderstats(self, ctx):
+        """Show render cache hit/miss counts (owner only)."""
+        await ctx.send(render_cache.report())
+
+    @commands.command()
+    async def battlestats(self, ctx):
+        """Show Discord API calls per battle (owner only)."""
+        battles = battle_stats["battles"]
+        calls = battle_stats["api_calls"]
+        per_battle = calls / battles if battles else 0
+        await ctx.send(f"Battles: {battles}, API calls: {calls} ({per_battle:.1f} per battle)")
+
+    @commands.command(name="metrics")
+    async def metrics_report(self, ctx):
+        """Show command latency, storage timings and API calls per command (owner only)."""
+        await ctx.send(f"```\n{metrics.report()}\n```")
+
+    @commands.command()
+    async def outbox(self, ctx):
+        """Show outbound message queue depth, merged sends and rate-limit waits (owner only)."""
+        await ctx.send(get_outbox(self.bot).report())
+
+    @commands.command()
+    async def sync(self, ctx):
+        """Register the bot's slash commands with Discord (owner only)."""
+        synced = await self.bot.tree.sync()
+        await ctx.send(f"Synced {len(synced)} slash command(s).")
+
+    @commands.command()
+    async def health(self, ctx):
+        """Show shard latencies and load for this process, or every worker when sharded (owner only)."""
+        if isinstance(self.store, SharedStore):
+            reports = await self.store.workers()
+        else:
+            reports = {"main": (self.bot.health(), 0)}
+        lines = []
+        for worker, (report, age) in sorted(reports.items()):
+            latencies = report.get("shards", {})
+            shards = ", ".join(f"{shard}: {ms} ms" for shard, ms in latencies.items()) or "none"
+            lines.append(f"{worker} (pid {report.get('pid')}, reported {age:.0f}s ago)\n"
+                         f"  shards {shards}\n"
+                         f"  {report.get('guilds', 0)} guilds, {report.get('commands', 0)} commands, "
+                         f"{report.get('players', 0)} players, {report.get('dirty', 0)} unsaved, "
+                         f"{report.get('queued', 0)} queued messages")
+        await ctx.send("```\n" + "\n".join(lines) + "\n```")
+
+    def select_players(self, ctx, filters):
+        """User ids matching ``filters``, starting from the narrowest available index."""
+        low, high = filters.level or (None, None)
+        if filters.server and ctx.guild is not None:
+            candidates = [str(m.id) for m in ctx.guild.members]
+        elif filters.level:
+            candidates = get_leaderboards(self.bot).boards["level"].between(low, high)
+        else:
+            candidates = [uid for uid, _ in self.store.items()]
+        selected = []
+        for user_id in candidates:
+            player = self.store.get(user_id)
+            if player is None:
+                continue
+            if filters.player_class and player.player_class != filters.player_class:
+                continue
+            if filters.level and not low <= player.level <= high:
+                continue
+            selected.append(user_id)
+        return selected
+
+    async def run_bulk(self, ctx, filters, label, change):
+        """Apply ``change(player)`` to every selected player, BULK_CHUNK players at a time.
+
+        ``change`` returns the player's economy change ``(gold_delta,
+        {item: qty_delta})``, or None if there is nothing to do; non-economy
+        fields (HP) it may set itself and return ``(0, {})``. Each chunk runs
+        under ``store.locked`` for its players, so in sharded mode it holds
+        their leases, sees other workers' latest writes and is written
+        through before the leases are released. Within the lock the chunk's
+        economy changes go through ``Ledger.apply`` as one entry and its
+        players are marked dirty. Store listeners are told once, at the end,
+        so each leaderboard re-sorts once rather than once per chunk. The
+        loop yields between chunks and a progress message is edited at most
+        every PROGRESS_INTERVAL seconds.
+        """
+        selected = self.select_players(ctx, filters)
+        if filters.dry:
+            await ctx.send(f"Dry run: {label} would affect {len(selected)} player(s).")
+            return
+        msg = await ctx.send(f"{label}: 0/{len(selected)}")
+        last_edit = time.monotonic()
+        changed = []
+        for start in range(0, len(selected), BULK_CHUNK):
+            chunk = selected[start:start + BULK_CHUNK]
+            async with self.store.locked(*chunk):
+                economy = {}
+                dirty = []
+                for user_id in chunk:
+                    player = self.store.get(user_id)
+                    if player is None:
+                        continue
+                    delta = change(player)
+                    if delta is None:
+                        continue
+                    dirty.append(user_id)
+                    if delta != (0, {}):
+                        economy[user_id] = delta
+                if economy:
+                    self.ledger.apply(self.store, f"admin:{ctx.command.name}", economy)
+                if dirty:
+                    self.store.mark_dirty(*dirty, notify=False)
+                    changed += dirty
+            await asyncio.sleep(0)
+            if time.monotonic() - last_edit >= PROGRESS_INTERVAL:
+                await msg.edit(content=f"{label}: {min(start + BULK_CHUNK, len(selected))}/{len(selected)}")
+                last_edit = time.monotonic()
+        if changed:
+            self.store.notify(changed)
+        await msg.edit(content=f"{label}: done, {len(changed)} of {len(selected)} player(s) changed.")
+
+    @commands.command()
+    async def bulkgold(self, ctx, amount: int, *, filters: BulkFilters):
+        """Give (or take, if negative) gold from every matching player (owner only)."""
+        def change(player):
+            # Taking gold stops at zero.
+            delta = max(player.gold + amount, 0) - player.gold
+            return (delta, {}) if delta else None
+        await self.run_bulk(ctx, filters, f"Granting {amount} gold", change)
+
+    @commands.command()
+    async def bulkitem(self, ctx, item: ItemName, qty: int, *, filters: BulkFilters):
+        """Give an item to every matching player (owner only). Use !wipeitem to take one away."""
+        if qty < 1:
+            await ctx.send("Quantity must be at least 1; use !wipeitem to remove an item.")
+            return
+        def change(player):
+            return (0, {item: qty})
+        await self.run_bulk(ctx, filters, f"Granting {qty}x {item}", change)
+
+    @commands.command()
+    async def wipeitem(self, ctx, item: str, *, filters: BulkFilters):
+        """Remove an item (e.g. an event currency) from every matching player (owner only)."""
+        def change(player):
+            qty = player.inventory.get(item, 0)
+            return (0, {item: -qty}) if qty else None
+        await self.run_bulk(ctx, filters, f"Wiping {item}", change)
+
+    @commands.command()
+    async def resethp(self, ctx, *, filters: BulkFilters):
+        """Restore every matching player to full HP (owner only)."""
+        def change(player):
+            if player.hp == player.max_hp:
+                return None
+            player.hp = player.max_hp
+            return (0, {})
+        await self.run_bulk(ctx, filters, "Resetting HP", change)
+
+async def setup(bot):
+    await bot.add_cog(Admin(bot))
@@ -1,154 +1,255 @@
 import discord
 from discord.ext import commands
-import random
-import json
-import os
-from ui.visual import format_hp_bar
-from systems.progression import Progression
+from ui.battle import BattleSession
+from systems import combat_engine as engine
+from systems.achievement import announce, emit
+from database.store import get_store
+from utils.outbox import get_outbox
+from utils.gamedata import game_data
 
-PLAYERS_FILE = os.path.join(os.path.dirname(__file__), '../data/players.json')
-CLASSES_FILE = os.path.join(os.path.dirname(__file__), '../data/classes.json')
-SKILLS_FILE = os.path.join(os.path.dirname(__file__), '../data/skills.json')
+CHALLENGE_TIMEOUT = 60
 
 class CombatView(discord.ui.View):
-    def __init__(self, actions):
+    def __init__(self, actor, actions):
         super().__init__(timeout=30)
+        self.actor = actor
         self.value = None
+        self.interaction = None
         for action in actions:
             self.add_item(CombatButton(action))
 
+    async def interaction_check(self, interaction: discord.Interaction):
+        # Only the player whose turn it is may pick the action.
+        if interaction.user.id == self.actor.id:
+            return True
+        await interaction.response.send_message(f"Plagg: It's {self.actor.display_name}'s turn, not yours!", ephemeral=True)
+        return False
+
 class CombatButton(discord.ui.Button):
     def __init__(self, action):
         super().__init__(label=action, style=discord.ButtonStyle.primary)
         self.action = action
 
     async def callback(self, interaction: discord.Interaction):
+        # The battle session answers the interaction with the next state.
         self.view.value = self.action
-        for item in self.view.children:
-            item.disabled = True
-        await interaction.response.edit_message(content=f"You chose **{self.action}**!", view=self.view)
+        self.view.interaction = interaction
         self.view.stop()
 
+class ChallengeView(discord.ui.View):
+    """Accept/Decline buttons that only the challenged player can press."""
+
+    def __init__(self, opponent):
+        super().__init__(timeout=CHALLENGE_TIMEOUT)
+        self.opponent = opponent
+        self.value = None
+        self.interaction = None
+
+    async def interaction_check(self, interaction: discord.Interaction):
+        if interaction.user.id == self.opponent.id:
+            return True
+        await interaction.response.send_message(f"Plagg: Only {self.opponent.display_name} can answer this challenge!", ephemeral=True)
+        return False
+
+    async def answer(self, interaction, value):
+        self.value = value
+        self.interaction = interaction
+        self.stop()
+
+    @discord.ui.button(label="Accept", style=discord.ButtonStyle.success)
+    async def accept(self, interaction: discord.Interaction, button: discord.ui.Button):
+        # The battle session answers the interaction with the first state.
+        await self.answer(interaction, True)
+
+    @discord.ui.button(label="Decline", style=discord.ButtonStyle.danger)
+    async def decline(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self.answer(interaction, False)
+
 class Combat(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-
-    def load_players(self):
-        with open(PLAYERS_FILE, 'r') as f:
-            return json.load(f)
-
-    def save_players(self, players):
-        with open(PLAYERS_FILE, 'w') as f:
-            json.dump(players, f, indent=2)
+        self.store = get_store(bot)
 
     def load_classes(self):
-        with open(CLASSES_FILE, 'r') as f:
-            return json.load(f)
+        return game_data.classes
 
     def load_skills(self):
-        with open(SKILLS_FILE, 'r') as f:
-            return json.load(f)
-
-    async def do_turn(self, ctx, attacker, defender, players, skills, is_pvp=False):
-        actions = ["Attack"]
-        # Add available skills
-        for skill_id in players[attacker]["skills"]:
-            if skill_id in skills:
-                actions.append(skills[skill_id]["name"])
-        view = CombatView(actions)
-        msg = await ctx.send(f"{ctx.author.mention}, choose your action:", view=view)
-        await view.wait()
-        action = view.value or "Attack"
-        if action == "Attack":
-            dmg = random.randint(10, 20)
-            players[defender]["hp"] = max(players[defender]["hp"] - dmg, 0)
-            self.save_players(players)
-            await msg.edit(content=f"Plagg: {ctx.author.mention} attacks for {dmg} damage!", view=None)
-        else:
-            # Skill logic (simple example)
-            for skill_id, skill in skills.items():
-                if skill["name"] == action:
-                    power = skill["power"]
-                    players[defender]["hp"] = max(players[defender]["hp"] - power, 0)
-                    self.save_players(players)
-                    await msg.edit(content=f"Plagg: {ctx.author.mention} uses {action} for {power} damage!", view=None)
-                    break
-        # Show HP bars
-        hp_text = f"{format_hp_bar(players[attacker]["hp"], players[attacker]["max_hp"])}\nvs\n{format_hp_bar(players[defender]["hp"], players[defender]["max_hp"])}"
-        await ctx.send(hp_text)
+        return game_data.skills
+
+    async def choose_action(self, session, actor, player, skills):
+        """Ask ``actor`` for an action.
+
+        Returns ``(skill_id, answered)``: the skill id is None for the basic
+        attack, which is also what a timeout falls back to; ``answered`` is
+        False when the prompt timed out.
+        """
+        view = CombatView(actor, engine.available_actions(player, skills))
+        action = await session.prompt(view, footer=f"{actor.display_name}, choose your action") or engine.ATTACK
+        skill_id = None if action == engine.ATTACK else game_data.skill_id_by_name(action)
+        return skill_id, view.interaction is not None
+
+    def describe(self, actor, result):
+        if result.skill_id is None:
+            return f"{actor.mention} attacks for {result.damage} damage!"
+        return f"{actor.mention} uses {result.action} for {result.damage} damage!"
+
+    async def do_turn(self, session, actor, attacker, defender, skills, acted):
+        """Ask ``actor`` for an action, then apply it. Returns the result, or None if the turn couldn't be played.
+
+        ``attacker`` is added to ``acted`` when ``actor`` answered the prompt themselves.
+
+        No lock is held while waiting for the choice: both players' locks are
+        taken only to apply the result, and the records are read again
+        there, since other commands may have changed them during the wait.
+        """
+        player = self.store.get(attacker)
+        if player is None:
+            return None
+        skill_id, answered = await self.choose_action(session, actor, player, skills)
+        if answered:
+            acted.add(attacker)
+        async with self.store.locked(attacker, defender):
+            player, target = self.store.get(attacker), self.store.get(defender)
+            if player is None or target is None or engine.is_over(player, target):
+                return None
+            result = engine.resolve_turn(target, skill_id, skills)
+            self.store.mark_dirty(defender)
+        session.log(self.describe(actor, result))
+        return result
 
     @commands.command()
     async def fight(self, ctx, opponent: discord.Member = None):
         """Start a PvP or PvE fight."""
-        players = self.load_players()
-        skills = self.load_skills()
-        user_id = str(ctx.author.id)
-        if user_id not in players:
+        if opponent and opponent != ctx.author:
+            await self.duel(ctx, opponent)
+        else:
+            await self.pve(ctx)
+
+    async def challenge(self, ctx, opponent):
+        """Ask ``opponent`` to accept a duel. Returns the challenge message and the accepting interaction, or None."""
+        view = ChallengeView(opponent)
+        message = await ctx.send(f"Plagg: {opponent.mention}, {ctx.author.mention} challenges you to a duel! Do you accept?",
+                                 view=view)
+        await view.wait()
+        if view.value:
+            return message, view.interaction
+        if view.value is None:
+            text = f"Plagg: {opponent.mention} didn't answer the challenge. Maybe next time!"
+        else:
+            text = f"Plagg: {opponent.mention} declined the duel. Coward... or wise? 🧀"
+        if view.interaction is not None:
+            await get_outbox(self.bot).respond(view.interaction.response.edit_message, content=text, view=None)
+        else:
+            await get_outbox(self.bot).edit(message, content=text, view=None)
+        return None
+
+    async def duel(self, ctx, opponent, accepted=False):
+        """Duel ``opponent``; unless ``accepted`` (e.g. both queued for it), they are asked first.
+
+        The rating only changes when both players made at least one move themselves.
+        """
+        user_id, opp_id = str(ctx.author.id), str(opponent.id)
+        players = {user_id: self.store.get(user_id), opp_id: self.store.get(opp_id)}
+        if players[user_id] is None:
             await ctx.send(f"Plagg: {ctx.author.mention}, you need to register first with !startrpg!")
             return
-        if opponent and opponent != ctx.author:
-            opp_id = str(opponent.id)
-            if opp_id not in players:
-                await ctx.send(f"Plagg: {opponent.mention} needs to register first with !startrpg!")
+        if players[opp_id] is None:
+            await ctx.send(f"Plagg: {opponent.mention} needs to register first with !startrpg!")
+            return
+        for member, player in ((ctx.author, players[user_id]), (opponent, players[opp_id])):
+            if player.hp <= 0:
+                await ctx.send(f"Plagg: {member.mention} is out of HP and can't duel. Eat some cheese first!")
                 return
-            await ctx.send(f"Plagg: {ctx.author.mention} challenges {opponent.mention} to a duel! 🐾")
-            # PvP: Each takes a turn until one is at 0 HP
-            turn = 0
-            while players[user_id]["hp"] > 0 and players[opp_id]["hp"] > 0:
-                if turn % 2 == 0:
-                    await self.do_turn(ctx, user_id, opp_id, players, skills, is_pvp=True)
-                else:
-                    await self.do_turn(ctx, opp_id, user_id, players, skills, is_pvp=True)
-                turn += 1
-            winner = ctx.author if players[user_id]["hp"] > 0 else opponent
-            await ctx.send(f"Plagg: {winner.mention} wins the duel!")
-            # Award achievement for first win
-            if players[str(winner.id)]["achievements"] == [] or "first_blood" not in players[str(winner.id)]["achievements"]:
-                Progression.award_achievement(self, players, str(winner.id), "first_blood")
-            # Optionally reset HP after battle
+        answer = None
+        if not accepted:
+            answer = await self.challenge(ctx, opponent)
+            if answer is None:
+                return
+        skills = self.load_skills()
+        session = BattleSession(ctx, "Duel! 🐾", self.store.get(user_id) or players[user_id],
+                                self.store.get(opp_id) or players[opp_id], ctx.author.display_name, opponent.display_name)
+        if answer is not None:
+            session.attach(*answer)
+            session.log(f"Plagg: {opponent.mention} accepts {ctx.author.mention}'s challenge!")
         else:
-            await ctx.send(f"Plagg: {ctx.author.mention} is fighting a wild akuma! 🦋")
-            # PvE: Fight a simple enemy
-            enemy = {"name": "Wild Akuma", "hp": 50, "max_hp": 50}
-            while players[user_id]["hp"] > 0 and enemy["hp"] > 0:
-                # Player turn
-                actions = ["Attack"]
-                for skill_id in players[user_id]["skills"]:
-                    if skill_id in skills:
-                        actions.append(skills[skill_id]["name"])
-                view = CombatView(actions)
-                msg = await ctx.send(f"{ctx.author.mention}, choose your action:", view=view)
-                await view.wait()
-                action = view.value or "Attack"
-                if action == "Attack":
-                    dmg = random.randint(10, 20)
-                    enemy["hp"] = max(enemy["hp"] - dmg, 0)
-                    await msg.edit(content=f"Plagg: {ctx.author.mention} attacks for {dmg} damage!", view=None)
-                else:
-                    for skill_id, skill in skills.items():
-                        if skill["name"] == action:
-                            power = skill["power"]
-                            enemy["hp"] = max(enemy["hp"] - power, 0)
-                            await msg.edit(content=f"Plagg: {ctx.author.mention} uses {action} for {power} damage!", view=None)
-                            break
-                hp_text = f"{format_hp_bar(players[user_id]["hp"], players[user_id]["max_hp"])}\nvs\n{format_hp_bar(enemy["hp"], enemy["max_hp"])}"
-                await ctx.send(hp_text)
-                # Enemy turn
-                if enemy["hp"] > 0:
-                    dmg = random.randint(5, 15)
-                    players[user_id]["hp"] = max(players[user_id]["hp"] - dmg, 0)
-                    self.save_players(players)
-                    await ctx.send(f"Plagg: The wild akuma attacks for {dmg} damage!")
-                    hp_text = f"{format_hp_bar(players[user_id]["hp"], players[user_id]["max_hp"])}\nvs\n{format_hp_bar(enemy["hp"], enemy["max_hp"])}"
-                    await ctx.send(hp_text)
-            if players[user_id]["hp"] > 0:
-                await ctx.send(f"Plagg: {ctx.author.mention} defeated the wild akuma!")
-                # Award achievement for first win
-                if players[user_id]["achievements"] == [] or "first_blood" not in players[user_id]["achievements"]:
-                    Progression.award_achievement(self, players, user_id, "first_blood")
+            session.log(f"Plagg: {ctx.author.mention} challenges {opponent.mention} to a duel!")
+        # PvP: Each takes a turn until one is at 0 HP
+        turns = ((ctx.author, user_id, opp_id), (opponent, opp_id, user_id))
+        played, acted = 0, set()
+        while True:
+            actor, attacker, defender = turns[played % 2]
+            if await self.do_turn(session, actor, attacker, defender, skills, acted) is None:
+                break
+            played += 1
+            left, right = self.store.get(user_id), self.store.get(opp_id)
+            session.set_combatants(left, right)
+            if left is None or right is None or engine.is_over(left, right):
+                break
+        awarded = []
+        async with self.store.locked(user_id, opp_id):
+            players = {user_id: self.store.get(user_id), opp_id: self.store.get(opp_id)}
+            if not played or None in players.values() or not engine.is_over(*players.values()):
+                # No turn was played, or a record vanished: there is no result to rate or reward.
+                text = "Plagg: The duel ended before it began!"
             else:
-                await ctx.send(f"Plagg: {ctx.author.mention} was defeated by the wild akuma!")
-            # Optionally reset HP after battle
+                winner, loser = (user_id, opp_id) if players[user_id].hp > 0 else (opp_id, user_id)
+                member = ctx.author if winner == user_id else opponent
+                text = f"Plagg: {member.mention} wins the duel!"
+                if len(acted) < 2:
+                    # Someone let every prompt time out: don't let that be farmed for rating or rewards.
+                    text += " It doesn't count for the rankings, since not both of you made a move."
+                else:
+                    players[winner].rating, players[loser].rating = engine.elo_update(
+                        engine.rating_of(players[winner]), engine.rating_of(players[loser]))
+                    awarded = emit(players[winner], "fight_won", pvp=True)
+                    self.store.mark_dirty(winner, loser)
+        await session.close(text)
+        if awarded:
+            await announce(ctx, member, awarded)
+        # Optionally reset HP after battle
+
+    async def pve(self, ctx):
+        # PvE: Fight a simple enemy
+        user_id = str(ctx.author.id)
+        player = self.store.get(user_id)
+        if player is None:
+            await ctx.send(f"Plagg: {ctx.author.mention}, you need to register first with !startrpg!")
+            return
+        skills = self.load_skills()
+        enemy = engine.new_enemy()
+        session = BattleSession(ctx, "A wild akuma appears! 🦋", player, enemy,
+                                ctx.author.display_name, enemy.name)
+        session.log(f"Plagg: {ctx.author.mention} is fighting a wild akuma!")
+        while player is not None and not engine.is_over(player, enemy):
+            # Player turn: only the enemy changes, so no lock is needed
+            skill_id, _ = await self.choose_action(session, ctx.author, player, skills)
+            result = engine.resolve_turn(enemy, skill_id, skills)
+            session.log(self.describe(ctx.author, result))
+            if enemy.hp <= 0:
+                break
+            # Enemy turn, on the player's record as it is now
+            async with self.store.locked(user_id):
+                player = self.store.get(user_id)
+                if player is None or player.hp <= 0:
+                    break
+                result = engine.resolve_enemy_turn(player)
+                self.store.mark_dirty(user_id)
+            session.set_combatants(player, enemy)
+            session.log(f"The wild akuma attacks for {result.damage} damage!")
+        async with self.store.locked(user_id):
+            player = self.store.get(user_id)
+            won = player is not None and player.hp > 0 and enemy.hp <= 0
+            awarded = []
+            if won:
+                # Saved even without an award: emit may have bumped a counter.
+                awarded = emit(player, "fight_won", pvp=False)
+                self.store.mark_dirty(user_id)
+        if won:
+            await session.close(f"Plagg: {ctx.author.mention} defeated the wild akuma!")
+        else:
+            await session.close(f"Plagg: {ctx.author.mention} was defeated by the wild akuma!")
+        await announce(ctx, ctx.author, awarded)
+        # Optionally reset HP after battle
 
 async def setup(bot):
-    await bot.add_cog(Combat(bot)) 
\ No newline at end of file
+    await bot.add_cog(Combat(bot))
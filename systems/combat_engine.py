@@ -0,0 +1,86 @@
+"""Turn resolution for fights, independent of Discord.
+
+The Combat cog asks the players for actions and renders the results; every
+rule about how much damage an action does lives here so that balance tools
+(see ``tools/simulate.py``) and the bot always agree.
+"""
+import random
+from typing import NamedTuple
+
+ATTACK = "Attack"
+# Inclusive damage range of the basic attack.
+ATTACK_DAMAGE = (10, 20)
+WILD_AKUMA = {"name": "Wild Akuma", "hp": 50, "max_hp": 50}
+# Inclusive damage range of the Wild Akuma's attack.
+ENEMY_DAMAGE = (5, 15)
+# Elo K-factor for PvP ratings.
+ELO_K = 32
+
+
+class TurnResult(NamedTuple):
+    action: str
+    skill_id: str
+    damage: int
+    target_hp: int
+
+
+class Enemy:
+    __slots__ = ("name", "hp", "max_hp")
+
+    def __init__(self, name, hp, max_hp):
+        self.name = name
+        self.hp = hp
+        self.max_hp = max_hp
+
+
+def new_enemy():
+    return Enemy(**WILD_AKUMA)
+
+
+def available_actions(player, skills):
+    """Action labels a player can pick: the basic attack plus known skills."""
+    actions = [ATTACK]
+    for skill_id in player.skills:
+        if skill_id in skills:
+            actions.append(skills[skill_id]["name"])
+    return actions
+
+
+def action_damage(skill_id, skills, rng=random):
+    """Damage of the basic attack (``skill_id`` None) or of a skill."""
+    if skill_id is None:
+        return rng.randint(*ATTACK_DAMAGE)
+    return skills[skill_id]["power"]
+
+
+def apply_damage(target, damage):
+    target.hp = max(target.hp - damage, 0)
+    return target.hp
+
+
+def resolve_turn(defender, skill_id, skills, rng=random):
+    """Resolve one player action against ``defender`` (a Player or Enemy)."""
+    damage = action_damage(skill_id, skills, rng)
+    action = ATTACK if skill_id is None else skills[skill_id]["name"]
+    return TurnResult(action, skill_id, damage, apply_damage(defender, damage))
+
+
+def resolve_enemy_turn(player, rng=random):
+    """Resolve the Wild Akuma's attack against ``player``."""
+    damage = rng.randint(*ENEMY_DAMAGE)
+    return TurnResult(ATTACK, None, damage, apply_damage(player, damage))
+
+
+def is_over(*combatants):
+    return any(c.hp <= 0 for c in combatants)
+
+
+def rating_of(player):
+    return player.rating
+
+
+def elo_update(winner_rating, loser_rating, k=ELO_K):
+    """Return the new (winner, loser) ratings after a duel."""
+    expected = 1 / (1 + 10 ** ((loser_rating - winner_rating) / 400))
+    change = round(k * (1 - expected))
+    return winner_rating + change, loser_rating - change
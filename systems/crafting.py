@@ -0,0 +1,160 @@
+"""Recipe graph for crafting.
+
+``data/recipes.json`` maps each craftable item to the materials one unit
+needs, e.g. ``{"enchanted_cheese": {"cheese": 2, "magic_dust": 1}}``.
+A material may itself have a recipe; when a player is short of an
+intermediate item, crafting makes it from its own materials first.
+"""
+from functools import lru_cache
+from typing import NamedTuple
+from utils.gamedata import game_data
+
+
+class CraftPlan(NamedTuple):
+    consumed: dict
+    crafted: dict
+    missing: dict
+
+    @property
+    def ok(self):
+        return not self.missing
+
+    def inventory_delta(self, item, qty):
+        """Net inventory change: materials taken from stock, plus the finished items."""
+        delta = {mat: -n for mat, n in self.consumed.items() if n}
+        delta[item] = delta.get(item, 0) + qty
+        return delta
+
+
+class RecipeGraph:
+    """recipes.json compiled into a DAG.
+
+    Recipes with no materials, or with an amount that isn't a whole number
+    of at least 1, are dropped, as are recipes on a cycle, so every kept
+    recipe has at least one material to divide stock by.
+    """
+
+    def __init__(self, recipes):
+        malformed = sorted(item for item, materials in recipes.items()
+                           if not isinstance(materials, dict) or not materials
+                           or not all(isinstance(amt, int) and amt >= 1 for amt in materials.values()))
+        if malformed:
+            print(f"Crafting: ignoring recipes with no materials or an amount that isn't a whole number >= 1: {', '.join(malformed)}")
+            recipes = {item: materials for item, materials in recipes.items() if item not in malformed}
+        self.recipes = {}
+        state = {}
+
+        def visit(item):
+            if state.get(item) == "done" or item not in recipes:
+                return True
+            if state.get(item) == "visiting":
+                return False
+            state[item] = "visiting"
+            ok = all(visit(mat) for mat in recipes[item])
+            state[item] = "done"
+            if ok:
+                self.recipes[item] = recipes[item]
+            return ok
+
+        for item in recipes:
+            visit(item)
+        dropped = set(recipes) - set(self.recipes)
+        if dropped:
+            print(f"Crafting: ignoring recipes on a cycle: {', '.join(sorted(dropped))}")
+        self.order = lru_cache(maxsize=None)(self._order)
+        self.raw_per_unit = lru_cache(maxsize=None)(self._raw_per_unit)
+
+    def __contains__(self, item):
+        return item in self.recipes
+
+    def _order(self, item):
+        """Items reachable from ``item``, each listed before all of its materials."""
+        seen = set()
+        postorder = []
+
+        def visit(node):
+            seen.add(node)
+            for mat in self.recipes.get(node, ()):
+                if mat not in seen:
+                    visit(mat)
+            postorder.append(node)
+
+        visit(item)
+        return tuple(reversed(postorder))
+
+    def _raw_per_unit(self, item):
+        """Uncraftable materials needed for one ``item`` if every intermediate is crafted."""
+        if item not in self.recipes:
+            return {item: 1}
+        raw = {}
+        for mat, amt in self.recipes[item].items():
+            for base, n in self.raw_per_unit(mat).items():
+                raw[base] = raw.get(base, 0) + n * amt
+        return raw
+
+    def limiting(self, item, inventory):
+        """``(count, material)`` craftable from stock without sub-crafting, in one pass over the recipe."""
+        best = None
+        for mat, amt in self.recipes[item].items():
+            count = inventory.get(mat, 0) // amt
+            if best is None or count < best[0]:
+                best = (count, mat)
+        return best
+
+    def plan(self, item, qty, inventory):
+        """Work out what making ``qty`` of ``item`` takes from ``inventory``."""
+        demand = {item: qty}
+        consumed, crafted, missing = {}, {}, {}
+        for node in self.order(item):
+            need = demand.get(node, 0)
+            if not need:
+                continue
+            make = need
+            if node != item:
+                take = min(inventory.get(node, 0), need)
+                consumed[node] = take
+                make = need - take
+            if not make:
+                continue
+            if node not in self.recipes:
+                missing[node] = make
+                continue
+            crafted[node] = make
+            for mat, amt in self.recipes[node].items():
+                demand[mat] = demand.get(mat, 0) + amt * make
+        return CraftPlan(consumed, crafted, missing)
+
+    def max_craftable(self, item, inventory):
+        """Most ``item`` that can be made from ``inventory``, crafting intermediates as needed."""
+        per_unit = self.raw_per_unit(item)
+        # Upper bound: every relevant stack broken down into raw materials.
+        available = {}
+        for node in self.order(item)[1:]:
+            for base, n in self.raw_per_unit(node).items():
+                available[base] = available.get(base, 0) + inventory.get(node, 0) * n
+        high = min(available.get(base, 0) // n for base, n in per_unit.items())
+        low = 0
+        while low < high:
+            mid = (low + high + 1) // 2
+            if self.plan(item, mid, inventory).ok:
+                low = mid
+            else:
+                high = mid - 1
+        return low
+
+
+_graph = None
+
+
+def _compile(recipes):
+    global _graph
+    _graph = RecipeGraph(recipes)
+
+
+game_data.on_reload("recipes", _compile)
+
+
+def get_recipe_graph():
+    """Return the graph for the current recipes.json, recompiling after a data reload."""
+    game_data.table("recipes")
+    return _graph
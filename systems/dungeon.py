@@ -1,68 +1,65 @@
 from discord.ext import commands
 import discord
-import json
-import os
-import random
-from systems.progression import Progression
-
-PLAYERS_FILE = os.path.join(os.path.dirname(__file__), '../data/players.json')
-DUNGEONS_FILE = os.path.join(os.path.dirname(__file__), '../data/dungeons.json')
+from systems import dungeon_engine as engine
+from systems.achievement import announce, emit
+from database.store import get_store
+from database.ledger import get_ledger
+from ui.dungeon_render import run_pages
+from ui.views import PageView
+from utils.gamedata import game_data
 
 class Dungeon(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-
-    def load_players(self):
-        with open(PLAYERS_FILE, 'r') as f:
-            return json.load(f)
-
-    def save_players(self, players):
-        with open(PLAYERS_FILE, 'w') as f:
-            json.dump(players, f, indent=2)
+        self.store = get_store(bot)
+        self.ledger = get_ledger(bot)
 
     def load_dungeons(self):
-        with open(DUNGEONS_FILE, 'r') as f:
-            return json.load(f)
+        return game_data.dungeons
+
+    async def send_run(self, ctx, run, player_name):
+        """Send a resolved run as one message, with page buttons if it needs more than one embed."""
+        pages = run_pages(run, engine.get_dungeon(run.dungeon_id), player_name, game_data.items)
+        await ctx.send(embed=pages[0], view=PageView(pages) if len(pages) > 1 else None)
 
     @commands.command()
     async def dungeons(self, ctx):
         """List available dungeons."""
         dungeons = self.load_dungeons()
-        desc = "\n".join([f"**{d['name']}**: {d['description']}" for d in dungeons.values()])
+        desc = "\n".join([f"**{d['name']}** ({d.get('rooms', engine.DEFAULT_ROOMS)} rooms): {d['description']}"
+                          for d in dungeons.values()])
         await ctx.send(f"**Available Dungeons:**\n{desc}")
 
     @commands.command()
     async def dungeon(self, ctx, dungeon_name: str = None):
         """Explore a dungeon (e.g., !dungeon sewers)."""
-        players = self.load_players()
-        user_id = str(ctx.author.id)
-        if user_id not in players:
-            await ctx.send(f"Plagg: {ctx.author.mention}, you need to register first with !startrpg!")
-            return
-        dungeons = self.load_dungeons()
-        if not dungeon_name or dungeon_name not in dungeons:
-            await ctx.send(f"Plagg: {ctx.author.mention}, specify a valid dungeon. Use !dungeons to list them.")
-            return
-        dungeon = dungeons[dungeon_name]
-        await ctx.send(f"Plagg: {ctx.author.mention} enters the **{dungeon['name']}**! {dungeon['description']}")
-        # Simulate 3 random encounters
-        for i in range(1, 4):
-            encounter = random.choice(dungeon['enemies'])
-            await ctx.send(f"Room {i}: You encounter a **{encounter}**!")
-            # Simple win/lose simulation
-            if random.random() < 0.8:
-                await ctx.send(f"Plagg: {ctx.author.mention} defeats the {encounter}!")
-            else:
-                await ctx.send(f"Plagg: {ctx.author.mention} was defeated by the {encounter}! Dungeon run ends.")
+        async with self.store.locked(ctx.author.id):
+            user_id = str(ctx.author.id)
+            player = self.store.get(user_id)
+            if player is None:
+                await ctx.send(f"Plagg: {ctx.author.mention}, you need to register first with !startrpg!")
+                return
+            # The whole run is resolved here, before anything is sent.
+            run = engine.resolve(dungeon_name, player.max_hp) if dungeon_name else None
+            if run is None:
+                await ctx.send(f"Plagg: {ctx.author.mention}, specify a valid dungeon. Use !dungeons to list them.")
                 return
-        # Rewards
-        reward = random.choice(dungeon['rewards'])
-        inv = players[user_id].setdefault('inventory', {})
-        inv[reward] = inv.get(reward, 0) + 1
-        # Award dungeon_crawler achievement
-        Progression.award_achievement(self, players, user_id, "dungeon_crawler")
-        self.save_players(players)
-        await ctx.send(f"Plagg: {ctx.author.mention} completes the dungeon and finds a **{reward}**!")
+            if run.gold or run.loot:
+                self.ledger.apply(self.store, "dungeon", {user_id: (run.gold, run.loot)})
+            awarded = emit(player, "dungeon_cleared", dungeon=dungeon_name) if run.cleared else []
+            if run.gold or run.loot or run.cleared:
+                self.store.mark_dirty(user_id)
+        await self.send_run(ctx, run, ctx.author.display_name)
+        await announce(ctx, ctx.author, awarded)
+
+    @commands.command()
+    async def replay(self, ctx, replay_id: str):
+        """Show a past dungeon run again from the replay id in its footer."""
+        run = engine.replay(replay_id)
+        if run is None:
+            await ctx.send(f"Plagg: {ctx.author.mention}, that replay id doesn't match any dungeon.")
+            return
+        await self.send_run(ctx, run, "The adventurer")
 
 async def setup(bot):
-    await bot.add_cog(Dungeon(bot)) 
\ No newline at end of file
+    await bot.add_cog(Dungeon(bot))
@@ -0,0 +1,185 @@
+"""Dungeon run resolution, independent of Discord.
+
+Each entry in ``data/dungeons.json`` describes its rooms and loot:
+
+    "sewers": {
+        "name": "Paris Sewers", "description": "Damp and cheesy.",
+        "rooms": 3, "scaling": 0.25,
+        "enemies": [{"name": "Rat", "weight": 5, "hp": 20, "damage": [2, 5]}, ...],
+        "gold": [3, 8],
+        "loot": [{"item": "cheese", "weight": 6, "qty": [1, 2]}, ...],
+        "loot_rolls": 1
+    }
+
+Every room draws a weighted enemy whose HP and damage grow by ``scaling``
+per room already passed. The player fights it with the basic attack from
+``combat_engine`` on HP carried over from the previous room, starting from
+their max HP. A cleared room pays ``gold``, scaled the same way. Clearing
+the last room rolls the ``loot`` table ``loot_rolls`` times, with
+quantities scaled by the dungeon's depth. Enemies given as plain names and
+the older ``"rewards"`` list of item ids read as weight 1 with default
+stats.
+
+A run is resolved in one pass from a seed, so the same dungeon, seed and
+starting HP always produce the same run. ``Run.replay_id`` packs those three
+values, and ``replay`` resolves the run again from it for as long as
+dungeons.json is unchanged.
+"""
+import random
+from itertools import accumulate
+from typing import NamedTuple
+
+from systems.combat_engine import ATTACK_DAMAGE
+from utils.gamedata import game_data
+
+DEFAULT_ROOMS = 3
+# Stats for enemies listed by name only.
+DEFAULT_ENEMY_HP = 30
+DEFAULT_ENEMY_DAMAGE = (4, 10)
+# Rounds after which a room counts as lost, so a bad table can't loop forever.
+MAX_ROUNDS = 100
+
+
+class EnemySpec(NamedTuple):
+    name: str
+    hp: int
+    damage: tuple
+
+
+class LootSpec(NamedTuple):
+    item: str
+    qty: tuple
+
+
+class Run(NamedTuple):
+    """A resolved run. ``events`` is the replay log, a short list of tuples:
+
+    * ``("room", depth, enemy name, enemy hp)``
+    * ``("won", depth, player hp left, rounds)`` or ``("lost", depth, 0, rounds)``
+    * ``("gold", depth, amount)``
+    * ``("loot", item, qty)``
+    """
+    dungeon_id: str
+    seed: int
+    max_hp: int
+    events: list
+    cleared: bool
+    gold: int
+    loot: dict
+
+    @property
+    def replay_id(self):
+        return f"{self.dungeon_id}.{self.max_hp}.{self.seed:x}"
+
+
+def _range(value, default):
+    if value is None:
+        return default
+    if isinstance(value, int):
+        return (value, value)
+    return tuple(value)
+
+
+class DungeonTable:
+    """One dungeons.json entry compiled for weighted draws."""
+
+    def __init__(self, dungeon_id, dungeon):
+        self.dungeon_id = dungeon_id
+        self.name = dungeon.get("name", dungeon_id)
+        self.description = dungeon.get("description", "")
+        self.rooms = dungeon.get("rooms", DEFAULT_ROOMS)
+        self.scaling = dungeon.get("scaling", 0)
+        self.gold = _range(dungeon.get("gold"), (0, 0))
+        self.loot_rolls = dungeon.get("loot_rolls", 1)
+        enemies, weights = [], []
+        for enemy in dungeon.get("enemies", ()):
+            if isinstance(enemy, str):
+                enemy = {"name": enemy}
+            enemies.append(EnemySpec(enemy["name"], enemy.get("hp", DEFAULT_ENEMY_HP),
+                                     _range(enemy.get("damage"), DEFAULT_ENEMY_DAMAGE)))
+            weights.append(enemy.get("weight", 1))
+        self.enemies = tuple(enemies)
+        self.enemy_weights = tuple(accumulate(weights))
+        loot, weights = [], []
+        for entry in dungeon.get("loot", [{"item": item} for item in dungeon.get("rewards", ())]):
+            loot.append(LootSpec(entry["item"], _range(entry.get("qty"), (1, 1))))
+            weights.append(entry.get("weight", 1))
+        self.loot = tuple(loot)
+        self.loot_weights = tuple(accumulate(weights))
+
+    def scale(self, value, depth):
+        return round(value * (1 + self.scaling * depth))
+
+    def resolve(self, seed, max_hp):
+        """Resolve a whole run for a player starting at ``max_hp``."""
+        rng = random.Random(seed)
+        events = []
+        hp = max_hp
+        gold = 0
+        loot = {}
+        cleared = bool(self.enemies)
+        for depth in range(self.rooms if self.enemies else 0):
+            spec = rng.choices(self.enemies, cum_weights=self.enemy_weights)[0]
+            enemy_hp = self.scale(spec.hp, depth)
+            low, high = (self.scale(d, depth) for d in spec.damage)
+            events.append(("room", depth, spec.name, enemy_hp))
+            rounds = 0
+            while enemy_hp > 0 and hp > 0 and rounds < MAX_ROUNDS:
+                rounds += 1
+                enemy_hp -= rng.randint(*ATTACK_DAMAGE)
+                if enemy_hp > 0:
+                    hp = max(hp - rng.randint(low, high), 0)
+            if enemy_hp > 0:
+                events.append(("lost", depth, 0, rounds))
+                cleared = False
+                break
+            events.append(("won", depth, hp, rounds))
+            if self.gold[1]:
+                amount = self.scale(rng.randint(*self.gold), depth)
+                gold += amount
+                events.append(("gold", depth, amount))
+        if cleared and self.loot:
+            for spec in rng.choices(self.loot, cum_weights=self.loot_weights, k=self.loot_rolls):
+                qty = self.scale(rng.randint(*spec.qty), self.rooms - 1)
+                loot[spec.item] = loot.get(spec.item, 0) + qty
+                events.append(("loot", spec.item, qty))
+        return Run(self.dungeon_id, seed, max_hp, events, cleared, gold, loot)
+
+
+_tables = {}
+
+
+def _compile(dungeons):
+    global _tables
+    _tables = {dungeon_id: DungeonTable(dungeon_id, dungeon) for dungeon_id, dungeon in dungeons.items()}
+
+
+game_data.on_reload("dungeons", _compile)
+
+
+def get_dungeon(dungeon_id):
+    """Return the compiled table for ``dungeon_id``, or None, recompiling after a data reload."""
+    game_data.table("dungeons")
+    return _tables.get(dungeon_id)
+
+
+def new_seed(rng=random):
+    return rng.getrandbits(32)
+
+
+def resolve(dungeon_id, max_hp, seed=None):
+    """Resolve a run through ``dungeon_id``; returns None for an unknown dungeon."""
+    table = get_dungeon(dungeon_id)
+    if table is None:
+        return None
+    return table.resolve(new_seed() if seed is None else seed, max_hp)
+
+
+def replay(replay_id):
+    """Resolve the run ``replay_id`` (see ``Run.replay_id``) again, or return None if it isn't valid."""
+    dungeon_id, _, rest = replay_id.rpartition(".")
+    dungeon_id, _, max_hp = dungeon_id.rpartition(".")
+    try:
+        return resolve(dungeon_id, int(max_hp), int(rest, 16))
+    except ValueError:
+        return None
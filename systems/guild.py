@@ -1 +1,289 @@
- 
\ No newline at end of file
+"""Player guilds with aggregates kept up to date as members change.
+
+A player's guild is the ``guild`` field on their record, so membership is
+saved, loaded and shared between workers like any other player data. A
+guild exists while it has members. ``GuildIndex`` subscribes to the player
+store and keeps everything current from ``mark_dirty``, whichever cog made
+the change:
+
+* ``guild_of`` (player -> guild) and each guild's member set;
+* per-guild totals (gold, levels, prestige), adjusted by the difference
+  between a member's new values and the ones last counted for them;
+* per-guild member boards and guild-vs-guild boards, sorted lists updated
+  in place like the player leaderboards (``systems/leaderboard.py``).
+
+Guild profiles and rankings therefore cost a dict lookup or a bisect, not a
+scan over every player. Building the index at startup is the one full pass.
+"""
+import math
+import re
+import discord
+from discord.ext import commands
+from database.store import get_store
+from database.ledger import get_ledger
+from systems.leaderboard import BOARDS, PAGE_SIZE, Board
+
+# Gold it costs to found a guild.
+GUILD_COST = 500
+MAX_MEMBERS = 50
+NAME_PATTERN = re.compile(r"[A-Za-z0-9 ]{3,24}")
+
+# Sort key per guild board; higher ranks first.
+GUILD_BOARDS = {
+    "gold": lambda g: (g.gold,),
+    "level": lambda g: (g.average_level,),
+    "members": lambda g: (len(g.members), g.level),
+    "prestige": lambda g: (g.prestige,),
+}
+
+
+def guild_key(name):
+    return name.strip().lower()
+
+
+class GuildStats:
+    """One guild's members and running totals."""
+
+    __slots__ = ("name", "members", "gold", "level", "prestige", "boards")
+
+    def __init__(self, name):
+        self.name = name
+        self.members = set()
+        self.gold = 0
+        self.level = 0
+        self.prestige = 0
+        # Member rankings inside the guild, one board per player leaderboard stat.
+        self.boards = {stat: Board(key) for stat, key in BOARDS.items()}
+
+    @property
+    def average_level(self):
+        return self.level / len(self.members) if self.members else 0
+
+
+class GuildIndex:
+    """Every guild, kept current by subscribing to the player store."""
+
+    def __init__(self, store):
+        self.store = store
+        self.guilds = {}
+        self.guild_of = {}
+        # user id -> (gold, level, prestige) as currently included in their guild's totals.
+        self._counted = {}
+        self.boards = {stat: Board(key) for stat, key in GUILD_BOARDS.items()}
+        for user_id, player in store.items():
+            if player.guild:
+                self._join(user_id, player)
+        for guild in self.guilds.values():
+            for board in guild.boards.values():
+                board.rebuild((user_id, store.get(user_id)) for user_id in guild.members)
+        for board in self.boards.values():
+            board.rebuild(self.guilds.items())
+        store.subscribe(self.update, self.update_many)
+
+    def find(self, name):
+        """The guild called ``name`` (case-insensitive), or None."""
+        return self.guilds.get(guild_key(name))
+
+    def _join(self, user_id, player):
+        key = guild_key(player.guild)
+        guild = self.guilds.get(key)
+        if guild is None:
+            guild = self.guilds[key] = GuildStats(player.guild)
+        guild.members.add(user_id)
+        self.guild_of[user_id] = key
+        counted = self._counted[user_id] = (player.gold, player.level, player.prestige)
+        guild.gold += counted[0]
+        guild.level += counted[1]
+        guild.prestige += counted[2]
+        return key, guild
+
+    def _leave(self, user_id):
+        key = self.guild_of.pop(user_id)
+        guild = self.guilds[key]
+        gold, level, prestige = self._counted.pop(user_id)
+        guild.gold -= gold
+        guild.level -= level
+        guild.prestige -= prestige
+        guild.members.discard(user_id)
+        return key, guild
+
+    def _apply(self, user_id, player):
+        """Move ``user_id``'s counted values to their current guild; returns the guild keys touched."""
+        new_key = guild_key(player.guild) if player is not None and player.guild else None
+        old_key = self.guild_of.get(user_id)
+        if old_key is None and new_key is None:
+            return ()
+        if old_key is not None:
+            key, guild = self._leave(user_id)
+            if key != new_key:
+                for board in guild.boards.values():
+                    board.update(user_id, None)
+                if not guild.members:
+                    del self.guilds[key]
+        if new_key is not None:
+            key, guild = self._join(user_id, player)
+            for board in guild.boards.values():
+                board.update(user_id, player)
+        return {old_key, new_key} - {None}
+
+    def update(self, user_id, player):
+        for key in self._apply(user_id, player):
+            self._rank(key, self.guilds.get(key))
+
+    def update_many(self, players):
+        touched = set()
+        for user_id, player in players.items():
+            touched.update(self._apply(user_id, player))
+        for board in self.boards.values():
+            board.update_many((key, self.guilds.get(key)) for key in touched)
+
+    def _rank(self, key, guild):
+        for board in self.boards.values():
+            board.update(key, guild)
+
+
+def get_guild_index(bot):
+    """Return the bot's GuildIndex, building it from the store on first use."""
+    index = getattr(bot, 'guild_index', None)
+    if index is None:
+        index = bot.guild_index = GuildIndex(get_store(bot))
+    return index
+
+
+class Guild(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+        self.store = get_store(bot)
+        self.ledger = get_ledger(bot)
+        self.index = get_guild_index(bot)
+
+    @commands.group(invoke_without_command=True)
+    async def guild(self, ctx, *, name: str = None):
+        """Show a guild's profile: yours, or another by name (e.g., !guild Cheese Lovers)."""
+        if name is None:
+            player = self.store.get(ctx.author.id)
+            if player is None or not player.guild:
+                await ctx.send(f"Plagg: {ctx.author.mention}, you're not in a guild. Try !guild create <name> or !guild join <name>.")
+                return
+            name = player.guild
+        guild = self.index.find(name)
+        if guild is None:
+            await ctx.send(f"Plagg: {ctx.author.mention}, there's no guild called {name}.")
+            return
+        key = guild_key(guild.name)
+        embed = discord.Embed(title=f"🛡️ {guild.name}", color=discord.Color.purple())
+        embed.add_field(name="Members", value=f"{len(guild.members)}/{MAX_MEMBERS}")
+        embed.add_field(name="Total Gold", value=guild.gold)
+        embed.add_field(name="Average Level", value=f"{guild.average_level:.1f}")
+        embed.add_field(name="Prestige", value=guild.prestige)
+        embed.add_field(name="Gold Rank", value=f"#{self.index.boards['gold'].rank(key)} of {len(self.index.guilds)}")
+        top = guild.boards["level"].page(1)[:5]
+        embed.add_field(name="Top Members",
+                        value="\n".join(f"**#{rank}** {self.store.get(uid).name or uid} - level {score}"
+                                        for rank, uid, score in top),
+                        inline=False)
+        await ctx.send(embed=embed)
+
+    @guild.command(name="create")
+    async def guild_create(self, ctx, *, name: str):
+        """Found a guild (costs gold)."""
+        async with self.store.locked(ctx.author.id):
+            user_id = str(ctx.author.id)
+            player = self.store.get(user_id)
+            if player is None:
+                await ctx.send(f"Plagg: {ctx.author.mention}, you need to register first with !startrpg!")
+                return
+            name = name.strip()
+            if player.guild:
+                await ctx.send(f"Plagg: {ctx.author.mention}, leave {player.guild} first!")
+                return
+            if not NAME_PATTERN.fullmatch(name):
+                await ctx.send(f"Plagg: {ctx.author.mention}, guild names are 3-24 letters, digits or spaces.")
+                return
+            if self.index.find(name) is not None:
+                await ctx.send(f"Plagg: {ctx.author.mention}, {name} already exists. Use !guild join {name}.")
+                return
+            if player.gold < GUILD_COST:
+                await ctx.send(f"Plagg: {ctx.author.mention}, founding a guild costs {GUILD_COST} gold!")
+                return
+            self.ledger.apply(self.store, "guild_create", {user_id: (-GUILD_COST, {})})
+            player.guild = name
+            self.store.mark_dirty(user_id)
+            await ctx.send(f"Plagg: {ctx.author.mention} founded **{name}**! Friends can join with !guild join {name}.")
+
+    @guild.command(name="join")
+    async def guild_join(self, ctx, *, name: str):
+        """Join an existing guild."""
+        async with self.store.locked(ctx.author.id):
+            user_id = str(ctx.author.id)
+            player = self.store.get(user_id)
+            if player is None:
+                await ctx.send(f"Plagg: {ctx.author.mention}, you need to register first with !startrpg!")
+                return
+            if player.guild:
+                await ctx.send(f"Plagg: {ctx.author.mention}, leave {player.guild} first!")
+                return
+            guild = self.index.find(name)
+            if guild is None:
+                await ctx.send(f"Plagg: {ctx.author.mention}, there's no guild called {name}.")
+                return
+            if len(guild.members) >= MAX_MEMBERS:
+                await ctx.send(f"Plagg: {ctx.author.mention}, {guild.name} is full!")
+                return
+            player.guild = guild.name
+            self.store.mark_dirty(user_id)
+            await ctx.send(f"Plagg: {ctx.author.mention} joined **{guild.name}**!")
+
+    @guild.command(name="leave")
+    async def guild_leave(self, ctx):
+        """Leave your guild. A guild with no members is disbanded."""
+        async with self.store.locked(ctx.author.id):
+            user_id = str(ctx.author.id)
+            player = self.store.get(user_id)
+            if player is None or not player.guild:
+                await ctx.send(f"Plagg: {ctx.author.mention}, you're not in a guild.")
+                return
+            name, player.guild = player.guild, None
+            self.store.mark_dirty(user_id)
+            await ctx.send(f"Plagg: {ctx.author.mention} left **{name}**.")
+
+    @guild.command(name="members")
+    async def guild_members(self, ctx, stat: str = "level", page: int = 1):
+        """Rank the members of your guild (e.g., !guild members gold)."""
+        player = self.store.get(ctx.author.id)
+        guild = self.index.find(player.guild) if player is not None and player.guild else None
+        if guild is None:
+            await ctx.send(f"Plagg: {ctx.author.mention}, you're not in a guild.")
+            return
+        if stat not in guild.boards:
+            await ctx.send(f"Plagg: {ctx.author.mention}, pick one of: {', '.join(guild.boards)}")
+            return
+        board = guild.boards[stat]
+        pages = max(1, math.ceil(len(board) / PAGE_SIZE))
+        page = min(max(page, 1), pages)
+        lines = [f"**#{rank}** {self.store.get(uid).name or uid} - {score}" for rank, uid, score in board.page(page)]
+        embed = discord.Embed(title=f"🛡️ {guild.name}: {stat.title()}", description="\n".join(lines),
+                              color=discord.Color.purple())
+        embed.set_footer(text=f"Page {page}/{pages}")
+        await ctx.send(embed=embed)
+
+    @guild.command(name="top")
+    async def guild_top(self, ctx, stat: str = "gold", page: int = 1):
+        """Show the top guilds (e.g., !guild top level 2)."""
+        if stat not in self.index.boards:
+            await ctx.send(f"Plagg: {ctx.author.mention}, pick one of: {', '.join(self.index.boards)}")
+            return
+        board = self.index.boards[stat]
+        pages = max(1, math.ceil(len(board) / PAGE_SIZE))
+        page = min(max(page, 1), pages)
+        lines = []
+        for rank, key, score in board.page(page):
+            value = f"{score:.1f}" if isinstance(score, float) else score
+            lines.append(f"**#{rank}** {self.index.guilds[key].name} - {value}")
+        embed = discord.Embed(title=f"🏆 Guild {stat.title()} Leaderboard",
+                              description="\n".join(lines) or "No guilds yet.", color=discord.Color.gold())
+        embed.set_footer(text=f"Page {page}/{pages}")
+        await ctx.send(embed=embed)
+
+async def setup(bot):
+    await bot.add_cog(Guild(bot))
@@ -1,6 +1,7 @@
 import discord
 from discord.ext import commands
 from ui.embeds import help_embed
+from ui.render_cache import render_cache
 from ui.views import HelpDropdownView
 
 class Help(commands.Cog):
@@ -11,11 +12,10 @@ class Help(commands.Cog):
     async def help(self, ctx):
         async def update_embed(interaction, category):
             if category == "all" or category == "getting_started":
-                embed = help_embed()
-            else:
-                embed = help_embed(category)
+                category = None
+            embed = render_cache.get(("help", category), lambda: help_embed(category))
             await interaction.response.edit_message(embed=embed, view=HelpDropdownView(update_embed))
-        embed = help_embed()
+        embed = render_cache.get(("help", None), help_embed)
         view = HelpDropdownView(update_embed)
         await ctx.send(embed=embed, view=view)
 
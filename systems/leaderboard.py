@@ -0,0 +1,188 @@
+import bisect
+import math
+import operator
+import discord
+from discord.ext import commands
+from database.store import get_store
+
+PAGE_SIZE = 10
+# Moved entries from which update_many re-sorts the board instead of moving them one by one.
+RESORT_AT = 1000
+
+# Sort key per board; higher ranks first. Ties break on user id.
+BOARDS = {
+    "level": lambda p: (p.level, p.xp),
+    "xp": lambda p: (p.xp,),
+    "gold": lambda p: (p.gold,),
+    "prestige": lambda p: (p.prestige, p.level),
+}
+
+
+class Board:
+    """One leaderboard kept as a list sorted by (negated score, user id).
+
+    Rank and position lookups are a bisect; an update removes the player's
+    old entry and inserts the new one, which is a binary search plus a
+    memmove of the list tail.
+    """
+
+    def __init__(self, key):
+        self.key = key
+        self.entries = []
+        self.current = {}
+
+    def _entry(self, user_id, player):
+        return (*map(operator.neg, self.key(player)), user_id)
+
+    def rebuild(self, players):
+        self.entries = sorted(self._entry(uid, p) for uid, p in players)
+        self.current = {entry[-1]: entry for entry in self.entries}
+
+    def update(self, user_id, player):
+        new = self._entry(user_id, player) if player is not None else None
+        if self.current.get(user_id) != new:
+            self._move(user_id, new)
+
+    def _move(self, user_id, new):
+        old = self.current.get(user_id)
+        if old is not None:
+            del self.entries[bisect.bisect_left(self.entries, old)]
+            del self.current[user_id]
+        if new is not None:
+            bisect.insort(self.entries, new)
+            self.current[user_id] = new
+
+    def update_many(self, players):
+        """Apply many updates at once: drop the moved entries, append their new ones and re-sort.
+
+        Players whose entry is unchanged are skipped, and fewer than
+        RESORT_AT moves are applied one by one. The kept entries are already
+        in order, so the sort merges two runs instead of doing one memmove
+        per player.
+        """
+        moved = {}
+        for user_id, player in players:
+            new = self._entry(user_id, player) if player is not None else None
+            if self.current.get(user_id) != new:
+                moved[user_id] = new
+        if len(moved) < RESORT_AT:
+            for user_id, new in moved.items():
+                self._move(user_id, new)
+            return
+        entries = [entry for entry in self.entries if entry[-1] not in moved]
+        added = []
+        for user_id, new in moved.items():
+            if new is None:
+                self.current.pop(user_id, None)
+            else:
+                self.current[user_id] = new
+                added.append(new)
+        added.sort()
+        entries += added
+        entries.sort()
+        self.entries = entries
+
+    def rank(self, user_id):
+        """1-based rank, or None for unknown players."""
+        entry = self.current.get(user_id)
+        if entry is None:
+            return None
+        return bisect.bisect_left(self.entries, entry) + 1
+
+    def between(self, low, high):
+        """User ids whose primary score is within ``low``..``high`` inclusive."""
+        start = bisect.bisect_left(self.entries, (-high,))
+        end = bisect.bisect_left(self.entries, (-low + 1,))
+        return [entry[-1] for entry in self.entries[start:end]]
+
+    def page(self, page, members=None):
+        """Return ``(rank, user_id, score)`` rows for a 1-based page, optionally only for ``members``."""
+        start = (page - 1) * PAGE_SIZE
+        if members is None:
+            rows = self.entries[start:start + PAGE_SIZE]
+            return [(start + i + 1, e[-1], -e[0]) for i, e in enumerate(rows)]
+        rows = []
+        position = 0
+        for entry in self.entries:
+            if entry[-1] in members:
+                position += 1
+                if position > start:
+                    rows.append((position, entry[-1], -entry[0]))
+                    if len(rows) == PAGE_SIZE:
+                        break
+        return rows
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class Leaderboards:
+    """Every board, kept current by subscribing to the player store."""
+
+    def __init__(self, store):
+        self.store = store
+        self.boards = {name: Board(key) for name, key in BOARDS.items()}
+        for board in self.boards.values():
+            board.rebuild(store.items())
+        store.subscribe(self.update, self.update_many)
+
+    def update(self, user_id, player):
+        for board in self.boards.values():
+            board.update(user_id, player)
+
+    def update_many(self, players):
+        for board in self.boards.values():
+            board.update_many(players.items())
+
+    def rank(self, stat, user_id):
+        return self.boards[stat].rank(str(user_id))
+
+
+def get_leaderboards(bot):
+    """Return the bot's shared Leaderboards, building them from the store on first use."""
+    boards = getattr(bot, 'leaderboards', None)
+    if boards is None:
+        boards = bot.leaderboards = Leaderboards(get_store(bot))
+    return boards
+
+
+class Leaderboard(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+        self.store = get_store(bot)
+        self.boards = get_leaderboards(bot)
+
+    @commands.command()
+    async def leaderboard(self, ctx, stat: str = "level", page: int = 1, scope: str = "global"):
+        """Show the top players (e.g., !leaderboard gold 2 server)."""
+        if stat not in BOARDS:
+            await ctx.send(f"Plagg: {ctx.author.mention}, pick one of: {', '.join(BOARDS)}")
+            return
+        board = self.boards.boards[stat]
+        members = None
+        if scope == "server" and ctx.guild is not None:
+            members = {str(m.id) for m in ctx.guild.members}
+            total = sum(1 for uid in members if uid in board.current)
+        else:
+            total = len(board)
+        pages = max(1, math.ceil(total / PAGE_SIZE))
+        page = min(max(page, 1), pages)
+        rows = board.page(page, members)
+        lines = []
+        for rank, user_id, score in rows:
+            player = self.store.get(user_id)
+            lines.append(f"**#{rank}** {player.name or user_id} - {score}")
+        embed = discord.Embed(
+            title=f"🏆 {stat.title()} Leaderboard" + (" (this server)" if members is not None else ""),
+            description="\n".join(lines) or "No players yet.",
+            color=discord.Color.gold()
+        )
+        rank = board.rank(str(ctx.author.id))
+        footer = f"Page {page}/{pages}"
+        if rank is not None:
+            footer += f" • Your global rank: #{rank}"
+        embed.set_footer(text=footer)
+        await ctx.send(embed=embed)
+
+async def setup(bot):
+    await bot.add_cog(Leaderboard(bot))
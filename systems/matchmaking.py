@@ -1,10 +1,213 @@
-from discord.ext import commands
+import asyncio
+import bisect
+import time
+from collections import OrderedDict, deque
+from discord.ext import commands, tasks
+from database.store import get_store
+from systems import combat_engine as engine
+
+# Ratings are grouped into buckets of this width for neighbour lookups.
+BUCKET_WIDTH = 50
+# Rating gap accepted straight away, how fast it grows per second waited, and its cap.
+BASE_WINDOW = 50
+WIDEN_PER_SECOND = 10
+MAX_WINDOW = 1000
+TICK_SECONDS = 2
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * q / 100), len(ordered) - 1)]
+
+
+class QueueEntry:
+    __slots__ = ("user_id", "rating", "joined", "ctx")
+
+    def __init__(self, user_id, rating, joined, ctx):
+        self.user_id = user_id
+        self.rating = rating
+        self.joined = joined
+        self.ctx = ctx
+
+    @property
+    def bucket(self):
+        return self.rating // BUCKET_WIDTH
+
+
+class MatchQueue:
+    """Players waiting for a duel, bucketed by rating.
+
+    ``entries`` keeps join order so the longest waiters are matched first;
+    each bucket is a dict in join order and ``bucket_keys`` lists the
+    non-empty buckets in sorted order. Joining and leaving are a dict update
+    plus, when a bucket appears or empties, one bisect into ``bucket_keys``.
+    """
+
+    def __init__(self):
+        self.entries = OrderedDict()
+        self.buckets = {}
+        self.bucket_keys = []
+        self.wait_times = deque(maxlen=1000)
+        self.tick_times = deque(maxlen=100)
+        self.matches = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, user_id):
+        return user_id in self.entries
+
+    def add(self, user_id, rating, ctx=None, now=None):
+        entry = QueueEntry(user_id, rating, time.monotonic() if now is None else now, ctx)
+        self.entries[user_id] = entry
+        bucket = self.buckets.get(entry.bucket)
+        if bucket is None:
+            bucket = self.buckets[entry.bucket] = {}
+            bisect.insort(self.bucket_keys, entry.bucket)
+        bucket[user_id] = entry
+        return entry
+
+    def remove(self, user_id):
+        entry = self.entries.pop(user_id, None)
+        if entry is None:
+            return None
+        bucket = self.buckets[entry.bucket]
+        del bucket[user_id]
+        if not bucket:
+            del self.buckets[entry.bucket]
+            del self.bucket_keys[bisect.bisect_left(self.bucket_keys, entry.bucket)]
+        return entry
+
+    def window(self, entry, now):
+        return min(BASE_WINDOW + WIDEN_PER_SECOND * (now - entry.joined), MAX_WINDOW)
+
+    def _partner(self, entry, window):
+        lo = bisect.bisect_left(self.bucket_keys, (entry.rating - window) // BUCKET_WIDTH)
+        hi = bisect.bisect_right(self.bucket_keys, (entry.rating + window) // BUCKET_WIDTH)
+        # Nearest buckets first; within a bucket the longest waiter first.
+        for key in sorted(self.bucket_keys[lo:hi], key=lambda k: abs(k - entry.bucket)):
+            for other in self.buckets[key].values():
+                if other is not entry and abs(other.rating - entry.rating) <= window:
+                    return other
+        return None
+
+    def match(self, now=None):
+        """Pair up everyone who has a partner within their rating window; returns (entry, entry) pairs."""
+        now = time.monotonic() if now is None else now
+        start = time.perf_counter()
+        pairs = []
+        for entry in list(self.entries.values()):
+            if entry.user_id not in self.entries:
+                continue
+            partner = self._partner(entry, self.window(entry, now))
+            if partner is None:
+                continue
+            self.remove(entry.user_id)
+            self.remove(partner.user_id)
+            self.wait_times.append(now - entry.joined)
+            self.wait_times.append(now - partner.joined)
+            pairs.append((entry, partner))
+        self.matches += len(pairs)
+        self.tick_times.append(time.perf_counter() - start)
+        return pairs
+
+    def report(self):
+        waits = list(self.wait_times)
+        ticks = list(self.tick_times)
+        return (
+            f"Queue depth: {len(self)} ({len(self.buckets)} rating buckets)\n"
+            f"Matches made: {self.matches}\n"
+            f"Wait time p50/p90/p99: {percentile(waits, 50):.1f}s / {percentile(waits, 90):.1f}s / {percentile(waits, 99):.1f}s\n"
+            f"Match tick p50/p99: {percentile(ticks, 50) * 1000:.2f}ms / {percentile(ticks, 99) * 1000:.2f}ms"
+        )
+
 
 class Matchmaking(commands.Cog):
+    """PvP matchmaking with one MatchQueue per server, so duels are only posted where both players are."""
+
     def __init__(self, bot):
         self.bot = bot
+        self.store = get_store(bot)
+        self.queues = {}
+        # user id -> id of the server whose queue they are in; a player waits in one queue at a time.
+        self.queued = {}
+        self._duels = set()
+
+    async def cog_load(self):
+        self.matchmaker.start()
+
+    async def cog_unload(self):
+        self.matchmaker.cancel()
+
+    def queue_for(self, guild_id):
+        queue = self.queues.get(guild_id)
+        if queue is None:
+            queue = self.queues[guild_id] = MatchQueue()
+        return queue
+
+    @tasks.loop(seconds=TICK_SECONDS)
+    async def matchmaker(self):
+        for queue in self.queues.values():
+            if len(queue) < 2:
+                continue
+            for first, second in queue.match():
+                self.queued.pop(first.user_id, None)
+                self.queued.pop(second.user_id, None)
+                task = asyncio.create_task(self.start_duel(first, second))
+                self._duels.add(task)
+                task.add_done_callback(self._duels.discard)
+
+    async def start_duel(self, first, second):
+        combat = self.bot.get_cog("Combat")
+        if combat is None:
+            await first.ctx.send("Plagg: The arena is closed right now. Try again later!")
+            return
+        if second.ctx.channel != first.ctx.channel:
+            await second.ctx.send(f"Plagg: {second.ctx.author.mention}, you've been matched! Head to {first.ctx.channel.mention} 🐾")
+        await combat.duel(first.ctx, second.ctx.author, accepted=True)
+
+    @commands.command()
+    async def queue(self, ctx):
+        """Join this server's PvP matchmaking queue."""
+        if ctx.guild is None:
+            await ctx.send(f"Plagg: {ctx.author.mention}, join the queue from a server channel, not DMs!")
+            return
+        user_id = str(ctx.author.id)
+        player = self.store.get(user_id)
+        if player is None:
+            await ctx.send(f"Plagg: {ctx.author.mention}, you need to register first with !startrpg!")
+            return
+        if player.hp <= 0:
+            await ctx.send(f"Plagg: {ctx.author.mention}, you're out of HP! Eat some cheese before you queue.")
+            return
+        if user_id in self.queued:
+            await ctx.send(f"Plagg: {ctx.author.mention}, you're already in the queue!")
+            return
+        queue = self.queue_for(ctx.guild.id)
+        rating = engine.rating_of(player)
+        queue.add(user_id, rating, ctx)
+        self.queued[user_id] = ctx.guild.id
+        await ctx.send(f"Plagg: {ctx.author.mention} joined the arena queue (rating {rating}). {len(queue)} waiting.")
+
+    @commands.command()
+    async def leavequeue(self, ctx):
+        """Leave the PvP matchmaking queue."""
+        user_id = str(ctx.author.id)
+        guild_id = self.queued.pop(user_id, None)
+        if guild_id is None or self.queues[guild_id].remove(user_id) is None:
+            await ctx.send(f"Plagg: {ctx.author.mention}, you're not in the queue.")
+            return
+        await ctx.send(f"Plagg: {ctx.author.mention} left the queue. Scared? 🧀")
 
-    # Add commands for matchmaking
+    @commands.command()
+    async def queuestats(self, ctx):
+        """Show this server's matchmaking queue depth and wait times."""
+        queue = self.queues.get(ctx.guild.id if ctx.guild else None)
+        if queue is None:
+            queue = MatchQueue()
+        await ctx.send(f"```\n{queue.report()}\n```")
 
 async def setup(bot):
-    await bot.add_cog(Matchmaking(bot)) 
\ No newline at end of file
+    await bot.add_cog(Matchmaking(bot))
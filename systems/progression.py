@@ -1,13 +1,12 @@
 from discord.ext import commands
 import discord
-import json
-import os
 from ui.embeds import player_profile_embed
-
-PLAYERS_FILE = os.path.join(os.path.dirname(__file__), '../data/players.json')
-CLASSES_FILE = os.path.join(os.path.dirname(__file__), '../data/classes.json')
-ACHIEVEMENTS_FILE = os.path.join(os.path.dirname(__file__), '../data/achievements.json')
-TITLES_FILE = os.path.join(os.path.dirname(__file__), '../data/titles.json')
+from ui.render_cache import render_cache
+from database.player import Player
+from database.store import get_store
+from systems.leaderboard import get_leaderboards
+from utils.gamedata import game_data
+from utils.metrics import metrics
 
 class ClassSelectView(discord.ui.View):
     def __init__(self, classes):
@@ -32,100 +31,80 @@ class ClassButton(discord.ui.Button):
 class Progression(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-
-    def load_players(self):
-        with open(PLAYERS_FILE, 'r') as f:
-            return json.load(f)
-
-    def save_players(self, players):
-        with open(PLAYERS_FILE, 'w') as f:
-            json.dump(players, f, indent=2)
+        self.store = get_store(bot)
 
     def load_classes(self):
-        with open(CLASSES_FILE, 'r') as f:
-            return json.load(f)
+        return game_data.classes
 
     def load_achievements(self):
-        with open(ACHIEVEMENTS_FILE, 'r') as f:
-            return json.load(f)
+        return game_data.achievements
 
     def load_titles(self):
-        with open(TITLES_FILE, 'r') as f:
-            return json.load(f)
+        return game_data.titles
 
     @commands.command()
     async def startrpg(self, ctx):
         """Register as a new player."""
-        players = self.load_players()
         user_id = str(ctx.author.id)
-        if user_id in players:
-            await ctx.send(f"Plagg: {ctx.author.mention}, you already have a profile! Use !profile to view it.")
-            return
-        # Default player data
-        player = {
-            "name": ctx.author.display_name,
-            "class": "Unassigned",
-            "level": 1,
-            "xp": 0,
-            "hp": 100,
-            "max_hp": 100,
-            "inventory": {},
-            "skills": [],
-        }
-        players[user_id] = player
-        self.save_players(players)
+        async with self.store.locked(user_id):
+            if user_id in self.store:
+                await ctx.send(f"Plagg: {ctx.author.mention}, you already have a profile! Use !profile to view it.")
+                return
+            self.store.create(user_id, Player(name=ctx.author.display_name))
         await ctx.send(f"Plagg: Welcome, {ctx.author.mention}! Your journey begins. Use !profile to view your stats.")
 
     @commands.command()
     async def profile(self, ctx, member: discord.Member = None):
         """View your or another player's profile."""
-        players = self.load_players()
         target = member or ctx.author
-        user_id = str(target.id)
-        if user_id not in players:
+        player = self.store.get(target.id)
+        if player is None:
             await ctx.send(f"Plagg: {target.mention} doesn't have a profile yet. Use !startrpg to start!")
             return
-        embed = player_profile_embed(players[user_id])
+        rank = get_leaderboards(self.bot).rank("level", target.id)
+        key = ("profile", str(target.id), self.store.version(target.id), rank)
+        embed = render_cache.get(key, lambda: player_profile_embed(player, rank))
         await ctx.send(embed=embed)
 
     @commands.command()
     async def chooseclass(self, ctx):
         """Choose your class (one-time only)."""
-        players = self.load_players()
-        user_id = str(ctx.author.id)
-        if user_id not in players:
-            await ctx.send(f"Plagg: {ctx.author.mention}, you need to register first with !startrpg!")
-            return
-        if players[user_id]["class"] != "Unassigned":
-            await ctx.send(f"Plagg: {ctx.author.mention}, you've already chosen a class!")
-            return
-        classes = self.load_classes()
-        view = ClassSelectView(classes)
-        msg = await ctx.send(f"{ctx.author.mention}, choose your class:", view=view)
-        await view.wait()
-        chosen = view.value
-        if not chosen:
-            await msg.edit(content="Class selection timed out.", view=None)
-            return
-        class_data = classes[chosen]
-        players[user_id]["class"] = class_data["name"]
-        players[user_id]["hp"] = class_data["base_stats"]["hp"]
-        players[user_id]["max_hp"] = class_data["base_stats"]["hp"]
-        # Optionally add other base stats
-        self.save_players(players)
-        await msg.edit(content=f"Plagg: {ctx.author.mention} is now a **{class_data['name']}**!", view=None)
+        async with self.store.locked(ctx.author.id):
+            user_id = str(ctx.author.id)
+            player = self.store.get(user_id)
+            if player is None:
+                await ctx.send(f"Plagg: {ctx.author.mention}, you need to register first with !startrpg!")
+                return
+            if player.player_class != "Unassigned":
+                await ctx.send(f"Plagg: {ctx.author.mention}, you've already chosen a class!")
+                return
+            classes = self.load_classes()
+            view = ClassSelectView(classes)
+            msg = await ctx.send(f"{ctx.author.mention}, choose your class:", view=view)
+            with metrics.timer("view_wait"):
+                await view.wait()
+            chosen = view.value
+            if not chosen:
+                await msg.edit(content="Class selection timed out.", view=None)
+                return
+            class_data = classes[chosen]
+            player.player_class = class_data["name"]
+            player.hp = class_data["base_stats"]["hp"]
+            player.max_hp = class_data["base_stats"]["hp"]
+            # Optionally add other base stats
+            self.store.mark_dirty(user_id)
+            await msg.edit(content=f"Plagg: {ctx.author.mention} is now a **{class_data['name']}**!", view=None)
 
     @commands.command()
     async def achievements(self, ctx, member: discord.Member = None):
         """View your or another player's achievements."""
-        players = self.load_players()
         achievements = self.load_achievements()
         target = member or ctx.author
-        user_id = str(target.id)
-        if user_id not in players:
+        player = self.store.get(target.id)
+        if player is None:
             await ctx.send(f"Plagg: {target.mention} doesn't have a profile yet. Use !startrpg to start!")
             return
-        unlocked = players[user_id].get("achievements", [])
+        unlocked = player.achievements
         if not unlocked:
             await ctx.send(f"Plagg: {target.mention} has no achievements yet.")
             return
@@ -135,14 +114,13 @@ class Progression(commands.Cog):
     @commands.command()
     async def titles(self, ctx, member: discord.Member = None):
         """View your or another player's unlocked titles."""
-        players = self.load_players()
         titles = self.load_titles()
         target = member or ctx.author
-        user_id = str(target.id)
-        if user_id not in players:
+        player = self.store.get(target.id)
+        if player is None:
             await ctx.send(f"Plagg: {target.mention} doesn't have a profile yet. Use !startrpg to start!")
             return
-        unlocked = players[user_id].get("titles", [])
+        unlocked = player.titles
         if not unlocked:
             await ctx.send(f"Plagg: {target.mention} has no titles yet.")
             return
@@ -152,55 +130,37 @@ class Progression(commands.Cog):
     @commands.command()
     async def settitle(self, ctx, title_id: str):
         """Set your active title."""
-        players = self.load_players()
-        titles = self.load_titles()
-        user_id = str(ctx.author.id)
-        if user_id not in players:
-            await ctx.send(f"Plagg: {ctx.author.mention}, you need to register first with !startrpg!")
-            return
-        if title_id not in players[user_id].get("titles", []):
-            await ctx.send(f"Plagg: {ctx.author.mention}, you haven't unlocked that title!")
-            return
-        players[user_id]["active_title"] = title_id
-        self.save_players(players)
-        await ctx.send(f"Plagg: {ctx.author.mention} equipped the title: {titles[title_id]['name']}!")
+        async with self.store.locked(ctx.author.id):
+            titles = self.load_titles()
+            user_id = str(ctx.author.id)
+            player = self.store.get(user_id)
+            if player is None:
+                await ctx.send(f"Plagg: {ctx.author.mention}, you need to register first with !startrpg!")
+                return
+            if title_id not in player.titles:
+                await ctx.send(f"Plagg: {ctx.author.mention}, you haven't unlocked that title!")
+                return
+            player.active_title = title_id
+            self.store.mark_dirty(user_id)
+            await ctx.send(f"Plagg: {ctx.author.mention} equipped the title: {titles[title_id]['name']}!")
 
     @commands.command()
     async def prestige(self, ctx):
         """Reset your level to 1 and gain a prestige point."""
-        players = self.load_players()
-        user_id = str(ctx.author.id)
-        if user_id not in players:
-            await ctx.send(f"Plagg: {ctx.author.mention}, you need to register first with !startrpg!")
-            return
-        player = players[user_id]
-        if player.get("level", 1) < 50:
-            await ctx.send(f"Plagg: {ctx.author.mention}, you must reach level 50 to prestige!")
-            return
-        player["level"] = 1
-        player["xp"] = 0
-        player["prestige"] = player.get("prestige", 0) + 1
-        self.save_players(players)
-        await ctx.send(f"Plagg: {ctx.author.mention} has prestiged! Total prestige: {player['prestige']}")
-
-    def award_achievement(self, players, user_id, achievement_id):
-        if "achievements" not in players[user_id]:
-            players[user_id]["achievements"] = []
-        if achievement_id not in players[user_id]["achievements"]:
-            players[user_id]["achievements"].append(achievement_id)
-            self.save_players(players)
-            # Award title if achievement matches a title requirement
-            titles = self.load_titles()
-            for tid, tdata in titles.items():
-                if tdata.get("requirement") == achievement_id:
-                    self.award_title(players, user_id, tid)
-
-    def award_title(self, players, user_id, title_id):
-        if "titles" not in players[user_id]:
-            players[user_id]["titles"] = []
-        if title_id not in players[user_id]["titles"]:
-            players[user_id]["titles"].append(title_id)
-            self.save_players(players)
+        async with self.store.locked(ctx.author.id):
+            user_id = str(ctx.author.id)
+            player = self.store.get(user_id)
+            if player is None:
+                await ctx.send(f"Plagg: {ctx.author.mention}, you need to register first with !startrpg!")
+                return
+            if player.level < 50:
+                await ctx.send(f"Plagg: {ctx.author.mention}, you must reach level 50 to prestige!")
+                return
+            player.level = 1
+            player.xp = 0
+            player.prestige += 1
+            self.store.mark_dirty(user_id)
+            await ctx.send(f"Plagg: {ctx.author.mention} has prestiged! Total prestige: {player.prestige}")
 
 async def setup(bot):
     await bot.add_cog(Progression(bot)) 
\ No newline at end of file
@@ -1 +1,268 @@
- 
\ No newline at end of file
+"""Shop catalog and item lookup.
+
+Both are rebuilt from ``data/items.json`` whenever it is reloaded:
+
+* ``Catalog`` renders the shop once per reload as pages of embeds, for all
+  items and for each item ``type`` (consumable, material, ...), so ``!shop``
+  only picks a precomputed page.
+* ``ItemIndex`` resolves what players type to an item id. Item ids and
+  display names are normalised (lowercase, letters and digits only) and kept
+  sorted for prefix lookups by bisection, plus a trigram index for fuzzy
+  matches, so ``ench``, ``Enchanted Cheese`` and ``enchanted_chese`` all
+  find ``enchanted_cheese``. ``ItemName`` applies the exact and prefix
+  lookups to arguments of commands that change state, ``ItemLookup`` adds
+  fuzzy matching for read-only ones, and ``item_autocomplete`` serves
+  slash-command autocomplete.
+"""
+import bisect
+import math
+from collections import Counter
+
+import discord
+from discord import app_commands
+from discord.ext import commands
+
+from ui.views import PageView
+from utils.gamedata import game_data
+
+# Items listed per catalog page.
+PAGE_SIZE = 10
+# Discord shows at most this many autocomplete choices.
+MAX_CHOICES = 25
+# Smallest trigram similarity (shared / all distinct trigrams) accepted as a fuzzy match.
+MIN_SIMILARITY = 0.3
+
+
+def normalize(text):
+    return "".join(ch for ch in text.lower() if ch.isalnum())
+
+
+def trigrams(key):
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class ItemIndex:
+    """Prefix and fuzzy lookup over item ids and display names."""
+
+    def __init__(self, items):
+        self.names = {item_id: item.get("name", item_id) for item_id, item in items.items()}
+        self.exact = {}
+        for item_id, name in self.names.items():
+            self.exact.setdefault(normalize(item_id), item_id)
+        for item_id, name in self.names.items():
+            self.exact.setdefault(normalize(name), item_id)
+        # Prefix keys: every exact key plus each word of an id or name, so "dust" finds Magic Dust.
+        prefixes = set(self.exact.items())
+        for item_id, name in self.names.items():
+            for word in f"{item_id} {name}".replace("_", " ").split():
+                prefixes.add((normalize(word), item_id))
+        prefixes = sorted(prefixes)
+        self.prefix_keys = [key for key, _ in prefixes]
+        self.prefix_ids = [item_id for _, item_id in prefixes]
+        self.grams = {}
+        self.gram_counts = {}
+        for key in self.exact:
+            grams = trigrams(key)
+            self.gram_counts[key] = len(grams)
+            for gram in grams:
+                self.grams.setdefault(gram, []).append(key)
+
+    def prefix(self, text, limit=MAX_CHOICES):
+        """Item ids with an id, name or word starting with ``text``, shortest match first."""
+        text = normalize(text)
+        keys = self.prefix_keys
+        matches = []
+        for i in range(bisect.bisect_left(keys, text), len(keys)):
+            if not keys[i].startswith(text):
+                break
+            matches.append((len(keys[i]), self.names[self.prefix_ids[i]], self.prefix_ids[i]))
+        matches.sort()
+        ids = []
+        for _, _, item_id in matches:
+            if item_id not in ids:
+                ids.append(item_id)
+                if len(ids) == limit:
+                    break
+        return ids
+
+    def fuzzy(self, text, limit=MAX_CHOICES):
+        """Item ids whose id or name shares enough trigrams with ``text``, best first."""
+        grams = trigrams(normalize(text))
+        shared = Counter()
+        for gram in grams:
+            shared.update(self.grams.get(gram, ()))
+        scored = []
+        for key, n in shared.items():
+            score = n / (len(grams) + self.gram_counts[key] - n)
+            if score >= MIN_SIMILARITY:
+                scored.append((-score, len(key), key))
+        scored.sort()
+        ids = []
+        for _, _, key in scored:
+            item_id = self.exact[key]
+            if item_id not in ids:
+                ids.append(item_id)
+                if len(ids) == limit:
+                    break
+        return ids
+
+    def resolve(self, text, fuzzy=True):
+        """The item ``text`` most likely means: an exact id or name, the only prefix match, or
+        (if ``fuzzy``) the best fuzzy match."""
+        key = normalize(text)
+        if key in self.exact:
+            return self.exact[key]
+        matches = self.prefix(key, 2)
+        if len(matches) == 1:
+            return matches[0]
+        if matches or not fuzzy:
+            return None
+        matches = self.fuzzy(key, 1)
+        return matches[0] if matches else None
+
+    def complete(self, text, limit=MAX_CHOICES):
+        """Suggestions for a partly typed item: prefix matches, then fuzzy ones."""
+        if not normalize(text):
+            return sorted(self.names, key=self.names.get)[:limit]
+        ids = self.prefix(text, limit)
+        for item_id in self.fuzzy(text, limit):
+            if len(ids) == limit:
+                break
+            if item_id not in ids:
+                ids.append(item_id)
+        return ids
+
+
+class Catalog:
+    """Shop pages for every category, rendered once per items.json load."""
+
+    def __init__(self, items):
+        by_category = {"all": []}
+        for item_id, item in sorted(items.items(), key=lambda entry: (entry[1].get("price", 0), entry[0])):
+            if "price" not in item:
+                continue
+            by_category["all"].append((item_id, item))
+            by_category.setdefault(item.get("type", "other"), []).append((item_id, item))
+        self.categories = tuple(sorted(by_category))
+        self.pages = {category: self._render(category, entries) for category, entries in by_category.items()}
+
+    def _render(self, category, entries):
+        count = max(1, math.ceil(len(entries) / PAGE_SIZE))
+        title = "🧀 Plagg's Shop" + ("" if category == "all" else f": {category.title()}")
+        pages = []
+        for number in range(count):
+            embed = discord.Embed(title=title, color=discord.Color.gold())
+            for item_id, item in entries[number * PAGE_SIZE:(number + 1) * PAGE_SIZE]:
+                embed.add_field(name=f"{item['name']} - {item['price']} gold",
+                                value=f"`{item_id}` {item.get('description', '')}", inline=False)
+            if not entries:
+                embed.description = "Nothing for sale right now."
+            embed.set_footer(text=f"Page {number + 1}/{count} • Categories: {', '.join(self.categories)}")
+            pages.append(embed)
+        return pages
+
+
+_catalog = None
+_index = None
+
+
+def _compile(items):
+    global _catalog, _index
+    _catalog = Catalog(items)
+    _index = ItemIndex(items)
+
+
+game_data.on_reload("items", _compile)
+
+
+def get_catalog():
+    """Return the catalog for the current items.json, rebuilding it after a data reload."""
+    game_data.table("items")
+    return _catalog
+
+
+def get_item_index():
+    """Return the lookup index for the current items.json, rebuilding it after a data reload."""
+    game_data.table("items")
+    return _index
+
+
+class UnknownItem(commands.BadArgument):
+    """Raised by ``ItemName`` for text that names no single item."""
+
+    def __init__(self, text, suggestions, ambiguous=False):
+        self.text = text
+        self.suggestions = suggestions
+        hint = f" Did you mean {', '.join(f'`{i}`' for i in suggestions)}?" if suggestions else ""
+        problem = f"{text} could be more than one item" if ambiguous else f"I don't know an item called {text}"
+        super().__init__(f"{problem}.{hint}")
+
+
+class ItemName(commands.Converter):
+    """Command argument resolved to an item id: an exact id or name, or a unique prefix.
+
+    Used by commands that spend gold or move items, so a near miss is never
+    swapped for a different item; anything else raises ``UnknownItem`` with
+    suggestions from ``ItemIndex.complete``.
+    """
+
+    async def convert(self, ctx, argument):
+        index = get_item_index()
+        item_id = index.resolve(argument, fuzzy=False)
+        if item_id is None:
+            raise UnknownItem(argument, index.complete(argument, 3), ambiguous=bool(index.prefix(argument, 1)))
+        return item_id
+
+
+class ItemLookup(commands.Converter):
+    """Command argument resolved by ``ItemIndex.resolve`` including fuzzy matches, for read-only commands.
+
+    Text that matches nothing is passed through unchanged, so commands still
+    answer it with their own "unknown item" message.
+    """
+
+    async def convert(self, ctx, argument):
+        return get_item_index().resolve(argument) or argument
+
+
+async def item_autocomplete(interaction, current):
+    index = get_item_index()
+    return [app_commands.Choice(name=index.names[item_id], value=item_id) for item_id in index.complete(current)]
+
+
+class Shop(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+
+    @commands.command()
+    async def shop(self, ctx, category: str = "all", page: int = 1):
+        """Browse the shop, optionally by category (e.g., !shop consumable 2)."""
+        if category.isdigit():
+            category, page = "all", int(category)
+        catalog = get_catalog()
+        pages = catalog.pages.get(category.lower())
+        if pages is None:
+            await ctx.send(f"Plagg: {ctx.author.mention}, pick a category: {', '.join(catalog.categories)}")
+            return
+        index = min(max(page, 1), len(pages)) - 1
+        await ctx.send(embed=pages[index], view=PageView(pages, index) if len(pages) > 1 else None)
+
+    @commands.hybrid_command()
+    @app_commands.autocomplete(item=item_autocomplete)
+    async def iteminfo(self, ctx, *, item: ItemLookup):
+        """Show an item's price and description; partial names work (e.g., !iteminfo ench)."""
+        data = game_data.items.get(item)
+        if data is None:
+            suggestions = ", ".join(f"`{i}`" for i in get_item_index().complete(item, 3))
+            hint = f" Did you mean {suggestions}?" if suggestions else ""
+            await ctx.send(f"Plagg: {ctx.author.mention}, I don't know that item.{hint}")
+            return
+        embed = discord.Embed(title=data["name"], description=data.get("description"), color=discord.Color.gold())
+        embed.add_field(name="Price", value=f"{data.get('price', '?')} gold")
+        embed.add_field(name="Type", value=data.get("type", "other"))
+        embed.set_footer(text=f"id: {item}")
+        await ctx.send(embed=embed)
+
+async def setup(bot):
+    await bot.add_cog(Shop(bot))
@@ -1,10 +1,156 @@
+from functools import lru_cache
 from discord.ext import commands
+from database.store import get_store
+from ui.skilltree_render import render_skilltree
+from utils.gamedata import game_data
+
+# Skill points earned per character level.
+SKILL_POINTS_PER_LEVEL = 1
+
+
+class SkillGraph:
+    """skills.json compiled into a prerequisite DAG.
+
+    Skills are numbered in topological order and each gets one bit, so a set
+    of unlocked skills is a single int. ``requires`` lists prerequisite skill
+    ids; ``class`` (a class display name, as stored on players) restricts a
+    skill to that class, and skills without one are open to every class.
+    Skills on a prerequisite cycle or depending on unknown skills are left
+    out of the tree.
+    """
+
+    def __init__(self, skills):
+        self.skills = skills
+        self.order = self._toposort(skills)
+        self.bit = {skill_id: 1 << i for i, skill_id in enumerate(self.order)}
+        self.prereqs = [self.mask_of(skills[skill_id].get("requires", ())) for skill_id in self.order]
+        self.common_mask = 0
+        self.class_masks = {}
+        for skill_id in self.order:
+            cls = skills[skill_id].get("class")
+            if cls:
+                self.class_masks[cls] = self.class_masks.get(cls, 0) | self.bit[skill_id]
+            else:
+                self.common_mask |= self.bit[skill_id]
+        self.render = lru_cache(maxsize=1024)(self._render)
+
+    @staticmethod
+    def _toposort(skills):
+        pending = {sid: set(s.get("requires", ())) for sid, s in skills.items()}
+        dependents = {}
+        for sid, reqs in pending.items():
+            for req in reqs:
+                dependents.setdefault(req, []).append(sid)
+        ready = sorted(sid for sid, reqs in pending.items() if not reqs)
+        order = []
+        while ready:
+            sid = ready.pop(0)
+            order.append(sid)
+            for dep in dependents.get(sid, ()):
+                pending[dep].discard(sid)
+                if not pending[dep]:
+                    ready.append(dep)
+        dropped = set(skills) - set(order)
+        if dropped:
+            print(f"Skill tree: ignoring skills with unresolvable prerequisites: {', '.join(sorted(dropped))}")
+        return order
+
+    def mask_of(self, skill_ids):
+        mask = 0
+        for skill_id in skill_ids:
+            mask |= self.bit.get(skill_id, 0)
+        return mask
+
+    def ids_of(self, mask):
+        ids = []
+        while mask:
+            low = mask & -mask
+            ids.append(self.order[low.bit_length() - 1])
+            mask ^= low
+        return ids
+
+    def class_mask(self, class_name):
+        return self.common_mask | self.class_masks.get(class_name, 0)
+
+    def unlockable(self, class_name, mask):
+        """Mask of skills whose prerequisites are all in ``mask`` and that aren't unlocked yet."""
+        candidates = self.class_mask(class_name) & ~mask
+        result = 0
+        while candidates:
+            low = candidates & -candidates
+            if self.prereqs[low.bit_length() - 1] & ~mask == 0:
+                result |= low
+            candidates ^= low
+        return result
+
+    def _render(self, class_name, mask):
+        tree = {skill_id: self.skills[skill_id] for skill_id in self.ids_of(self.class_mask(class_name))}
+        return render_skilltree(tree, set(self.ids_of(mask)), set(self.ids_of(self.unlockable(class_name, mask))))
+
+
+_tree = None
+
+
+def _compile(skills):
+    global _tree
+    _tree = SkillGraph(skills)
+
+
+game_data.on_reload("skills", _compile)
+
+
+def get_skill_tree():
+    """Return the tree for the current skills.json, recompiling after a data reload."""
+    game_data.table("skills")
+    return _tree
+
 
 class SkillTree(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self.store = get_store(bot)
+
+    @commands.command()
+    async def skilltree(self, ctx):
+        """View your class skill tree."""
+        player = self.store.get(ctx.author.id)
+        if player is None:
+            await ctx.send(f"Plagg: {ctx.author.mention}, you need to register first with !startrpg!")
+            return
+        tree = get_skill_tree()
+        mask = tree.mask_of(player.skills)
+        text = tree.render(player.player_class, mask) or "No skills for your class yet."
+        points = player.level * SKILL_POINTS_PER_LEVEL - len(player.skills)
+        await ctx.send(f"**{ctx.author.display_name}'s Skill Tree** ({points} skill points)\n{text}")
 
-    # Add commands for skill tree management
+    @commands.command()
+    async def learn(self, ctx, skill_id: str):
+        """Unlock a skill whose prerequisites you have (e.g., !learn cataclysm)."""
+        async with self.store.locked(ctx.author.id):
+            user_id = str(ctx.author.id)
+            player = self.store.get(user_id)
+            if player is None:
+                await ctx.send(f"Plagg: {ctx.author.mention}, you need to register first with !startrpg!")
+                return
+            tree = get_skill_tree()
+            bit = tree.bit.get(skill_id)
+            if bit is None:
+                await ctx.send(f"Plagg: {ctx.author.mention}, that skill doesn't exist!")
+                return
+            known = player.skills
+            mask = tree.mask_of(known)
+            if mask & bit:
+                await ctx.send(f"Plagg: {ctx.author.mention}, you already know that one!")
+                return
+            if not tree.unlockable(player.player_class, mask) & bit:
+                await ctx.send(f"Plagg: {ctx.author.mention}, you can't learn that yet. Check !skilltree.")
+                return
+            if player.level * SKILL_POINTS_PER_LEVEL <= len(known):
+                await ctx.send(f"Plagg: {ctx.author.mention}, you're out of skill points. Level up first!")
+                return
+            player.skills = known + (skill_id,)
+            self.store.mark_dirty(user_id)
+            await ctx.send(f"Plagg: {ctx.author.mention} learned **{tree.skills[skill_id]['name']}**!")
 
 async def setup(bot):
-    await bot.add_cog(SkillTree(bot)) 
\ No newline at end of file
+    await bot.add_cog(SkillTree(bot))
@@ -0,0 +1,141 @@
+"""Monte Carlo balance simulator for the combat rules in systems/combat_engine.py.
+
+Fights are simulated in bulk with NumPy: every fight is a lane in a set of
+arrays and each loop iteration resolves one turn for all fights still running.
+
+    python -m tools.simulate pve --class warrior --skills cataclysm --fights 1000000
+    python -m tools.simulate pvp --class warrior --vs-class mage --vs-skills fireball
+
+Loadouts come from data/classes.json (``base_stats.hp``) and data/skills.json.
+The ``best`` policy always uses the action with the highest average damage;
+``random`` picks uniformly among the loadout's actions every turn.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from systems import combat_engine as engine
+from utils.gamedata import game_data
+
+DEFAULT_HP = 100
+MAX_TURNS = 500
+
+
+def damage_table(skill_ids, skills):
+    """(actions, 2) array of inclusive damage ranges: basic attack first, then skills."""
+    ranges = [engine.ATTACK_DAMAGE]
+    for skill_id in skill_ids:
+        power = skills[skill_id]["power"]
+        ranges.append((power, power))
+    return np.array(ranges, dtype=np.int64)
+
+
+def roll_damage(rng, table, policy, size):
+    if policy == "best":
+        idx = np.full(size, int(np.argmax(table.sum(axis=1))))
+    else:
+        idx = rng.integers(0, len(table), size)
+    return rng.integers(table[idx, 0], table[idx, 1] + 1)
+
+
+def simulate_pve(fights, player_hp, table, policy, rng, max_turns=MAX_TURNS):
+    """Player vs Wild Akuma. Returns (won, turns, player_hp_left) arrays."""
+    enemy_lo, enemy_hi = engine.ENEMY_DAMAGE
+    hp = np.full(fights, player_hp, dtype=np.int64)
+    enemy = np.full(fights, engine.WILD_AKUMA["hp"], dtype=np.int64)
+    turns = np.zeros(fights, dtype=np.int64)
+    active = np.arange(fights)
+    for turn in range(1, max_turns + 1):
+        if active.size == 0:
+            break
+        enemy[active] -= roll_damage(rng, table, policy, active.size)
+        turns[active] = turn
+        hit = active[enemy[active] > 0]
+        hp[hit] -= rng.integers(enemy_lo, enemy_hi + 1, hit.size)
+        active = active[(enemy[active] > 0) & (hp[active] > 0)]
+    return enemy <= 0, turns, np.maximum(hp, 0)
+
+
+def simulate_pvp(fights, hp_a, table_a, hp_b, table_b, policy, rng, max_turns=MAX_TURNS):
+    """Challenger (A, moves first) vs opponent (B). Returns (a_won, turns, winner_hp_left)."""
+    a = np.full(fights, hp_a, dtype=np.int64)
+    b = np.full(fights, hp_b, dtype=np.int64)
+    turns = np.zeros(fights, dtype=np.int64)
+    active = np.arange(fights)
+    for turn in range(1, max_turns + 1):
+        if active.size == 0:
+            break
+        b[active] -= roll_damage(rng, table_a, policy, active.size)
+        turns[active] = turn
+        hit = active[b[active] > 0]
+        a[hit] -= roll_damage(rng, table_b, policy, hit.size)
+        active = active[(a[active] > 0) & (b[active] > 0)]
+    a_won = b <= 0
+    return a_won, turns, np.where(a_won, np.maximum(a, 0), np.maximum(b, 0))
+
+
+def report(label, won, turns, hp_left, max_hp, elapsed=None):
+    timing = f" in {elapsed:.2f}s" if elapsed is not None else ""
+    print(f"{label}: {won.size:,} fights{timing}")
+    print(f"  win rate: {won.mean():.2%}")
+    if won.any():
+        kill_turns = turns[won]
+        pct = np.percentile(kill_turns, [10, 50, 90, 99])
+        print(f"  turns to kill  p10={pct[0]:.0f} p50={pct[1]:.0f} p90={pct[2]:.0f} p99={pct[3]:.0f}")
+        counts = np.bincount(kill_turns)
+        dist = ", ".join(f"{t}:{c / kill_turns.size:.1%}" for t, c in enumerate(counts) if c)
+        print(f"  turns to kill distribution  {dist}")
+        hp_pct = np.percentile(hp_left[won] / max_hp * 100, [10, 50, 90])
+        print(f"  HP remaining %  p10={hp_pct[0]:.0f} p50={hp_pct[1]:.0f} p90={hp_pct[2]:.0f}")
+
+
+def class_hp(class_id, override):
+    if override:
+        return override
+    if class_id is None:
+        return DEFAULT_HP
+    return game_data.classes[class_id]["base_stats"]["hp"]
+
+
+def parse_skills(value):
+    skills = [s for s in (value or "").split(",") if s]
+    unknown = [s for s in skills if s not in game_data.skills]
+    if unknown:
+        raise SystemExit(f"Unknown skills: {', '.join(unknown)}")
+    return skills
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Monte Carlo combat balance simulator")
+    parser.add_argument("mode", choices=["pve", "pvp"])
+    parser.add_argument("--class", dest="class_id", help="class id from classes.json")
+    parser.add_argument("--skills", help="comma-separated skill ids")
+    parser.add_argument("--hp", type=int, help="override starting HP")
+    parser.add_argument("--vs-class", help="opponent class id (pvp)")
+    parser.add_argument("--vs-skills", help="opponent skill ids (pvp)")
+    parser.add_argument("--vs-hp", type=int, help="override opponent HP (pvp)")
+    parser.add_argument("--fights", type=int, default=1_000_000)
+    parser.add_argument("--policy", choices=["best", "random"], default="best")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    skills = game_data.skills
+    hp = class_hp(args.class_id, args.hp)
+    table = damage_table(parse_skills(args.skills), skills)
+    start = time.perf_counter()
+    if args.mode == "pve":
+        won, turns, hp_left = simulate_pve(args.fights, hp, table, args.policy, rng)
+        report("PvE vs Wild Akuma", won, turns, hp_left, hp, time.perf_counter() - start)
+    else:
+        vs_hp = class_hp(args.vs_class, args.vs_hp)
+        vs_table = damage_table(parse_skills(args.vs_skills), skills)
+        won, turns, hp_left = simulate_pvp(args.fights, hp, table, vs_hp, vs_table, args.policy, rng)
+        elapsed = time.perf_counter() - start
+        report("PvP (challenger's view)", won, turns, hp_left, hp, elapsed)
+        report("PvP (opponent's view)", ~won, turns, hp_left, vs_hp)
+
+
+if __name__ == "__main__":
+    main()
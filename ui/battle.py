@@ -0,0 +1,106 @@
+import asyncio
+import time
+from collections import Counter, deque
+
+import discord
+
+from ui.visual import format_hp_bar
+from utils.metrics import metrics
+from utils.outbox import get_outbox
+
+# Discord allows roughly 5 edits per message per 5 seconds; state changes
+# closer together than this are merged into one edit.
+EDIT_WINDOW = 1.0
+LOG_LINES = 6
+
+# Totals across every battle since startup: battles, api_calls.
+battle_stats = Counter()
+
+
+class BattleSession:
+    """One embed per fight, edited in place as the fight progresses.
+
+    ``log`` records an action and schedules a coalesced edit; ``prompt``
+    shows the action buttons and waits for a choice. When the previous prompt
+    was answered by a button click, the next render is sent as that
+    interaction's response, so a whole turn costs a single API call.
+    ``api_calls`` counts every message send/edit made for this battle. All
+    of them go through the bot's Outbox, so edits respect the channel's
+    rate limit and the interaction responses go out ahead of queued messages.
+    """
+
+    def __init__(self, ctx, title, left, right, left_name, right_name):
+        self.ctx = ctx
+        self.title = title
+        self.sides = ((left_name, left), (right_name, right))
+        self.lines = deque(maxlen=LOG_LINES)
+        self.footer = None
+        self.message = None
+        self.api_calls = 0
+        self._interaction = None
+        self._last_edit = 0.0
+        self._pending = None
+        battle_stats["battles"] += 1
+
+    def embed(self):
+        embed = discord.Embed(title=self.title, description="\n".join(self.lines) or None, color=discord.Color.red())
+        for name, combatant in self.sides:
+            embed.add_field(name=name, value=f"`{format_hp_bar(combatant.hp, combatant.max_hp)}`", inline=False)
+        if self.footer:
+            embed.set_footer(text=self.footer)
+        return embed
+
+    def attach(self, message, interaction=None):
+        """Continue in ``message`` (e.g. an accepted challenge) instead of sending a new one."""
+        self.message = message
+        self._interaction = interaction
+
+    def set_combatants(self, left, right):
+        """Show these records from now on (a shared store may have reloaded a player's record)."""
+        if left is not None and right is not None:
+            self.sides = ((self.sides[0][0], left), (self.sides[1][0], right))
+
+    def log(self, text):
+        self.lines.append(text)
+        if self.message is not None and self._pending is None:
+            self._pending = asyncio.get_running_loop().create_task(self._deferred_render())
+
+    async def _deferred_render(self):
+        await asyncio.sleep(max(self._last_edit + EDIT_WINDOW - time.monotonic(), 0))
+        self._pending = None
+        await self._render(discord.utils.MISSING)
+
+    async def _render(self, view):
+        if self._pending is not None:
+            self._pending.cancel()
+            self._pending = None
+        kwargs = {"embed": self.embed()}
+        if view is not discord.utils.MISSING:
+            kwargs["view"] = view
+        interaction, self._interaction = self._interaction, None
+        outbox = get_outbox(self.ctx.bot)
+        if interaction is not None and not interaction.response.is_done():
+            await outbox.respond(interaction.response.edit_message, **kwargs)
+        elif self.message is None:
+            self.message = await self.ctx.send(**kwargs)
+        else:
+            await outbox.edit(self.message, **kwargs)
+        self.api_calls += 1
+        battle_stats["api_calls"] += 1
+        self._last_edit = time.monotonic()
+
+    async def prompt(self, view, footer=None):
+        """Show ``view`` under the current state and wait for it; returns ``view.value``."""
+        self.footer = footer
+        await self._render(view)
+        with metrics.timer("view_wait"):
+            await view.wait()
+        self._interaction = getattr(view, "interaction", None)
+        return view.value
+
+    async def close(self, text=None):
+        """Render the final state without buttons."""
+        if text:
+            self.lines.append(text)
+        self.footer = None
+        await self._render(None)
@@ -0,0 +1,45 @@
+import discord
+
+# Rooms shown per page of a run's result.
+ROOMS_PER_PAGE = 4
+
+
+def _room_fields(run):
+    """``[field name, field value]`` per room, built from the replay log."""
+    rooms = []
+    for event in run.events:
+        kind = event[0]
+        if kind == "room":
+            _, depth, enemy, enemy_hp = event
+            rooms.append([f"Room {depth + 1}: {enemy} ({enemy_hp} HP)", ""])
+        elif kind == "won":
+            _, _, hp, rounds = event
+            rooms[-1][1] = f"Defeated in {rounds} round(s), {hp}/{run.max_hp} HP left"
+        elif kind == "lost":
+            rooms[-1][1] = f"Knocked out after {event[3]} round(s). The run ends here."
+        elif kind == "gold":
+            rooms[-1][1] += f" • +{event[2]} gold"
+    return rooms
+
+
+def run_pages(run, table, player_name, items):
+    """Render a resolved dungeon run as a list of embeds, ROOMS_PER_PAGE rooms each."""
+    rooms = _room_fields(run)
+    if run.cleared:
+        found = ", ".join(f"{items.get(item, {}).get('name', item)} x{qty}" for item, qty in run.loot.items())
+        result = f"{player_name} cleared the dungeon! +{run.gold} gold" + (f", found {found}" if found else "")
+        color = discord.Color.green()
+    else:
+        result = f"{player_name} was defeated. Kept {run.gold} gold from the cleared rooms."
+        color = discord.Color.dark_red()
+    chunks = [rooms[i:i + ROOMS_PER_PAGE] for i in range(0, len(rooms), ROOMS_PER_PAGE)] or [[]]
+    pages = []
+    for number, chunk in enumerate(chunks, 1):
+        embed = discord.Embed(title=f"🕯️ {table.name}", description=table.description if number == 1 else None,
+                              color=color)
+        for name, value in chunk:
+            embed.add_field(name=name, value=value or "…", inline=False)
+        embed.add_field(name="Result", value=result, inline=False)
+        embed.set_footer(text=f"Page {number}/{len(chunks)} • Replay: {run.replay_id}")
+        pages.append(embed)
+    return pages
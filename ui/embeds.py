@@ -24,14 +24,16 @@ def help_embed(category=None):
     return embed
 
 # Player profile embed implementation
-def player_profile_embed(player):
+def player_profile_embed(player, rank=None):
     """Return a Discord embed for the player profile."""
     embed = discord.Embed(
-        title=f"{player.get('username', 'Unknown')}'s Profile",
+        title=f"{player.name or 'Unknown'}'s Profile",
         color=discord.Color.green()
     )
-    embed.add_field(name="Class", value=player.get('class', 'Unassigned'))
-    embed.add_field(name="Level", value=player.get('level', 1))
-    embed.add_field(name="HP", value=f"{player.get('hp', 0)}/{player.get('max_hp', 0)}")
-    embed.add_field(name="Gold", value=player.get('gold', 0))
+    embed.add_field(name="Class", value=player.player_class)
+    embed.add_field(name="Level", value=player.level)
+    embed.add_field(name="HP", value=f"{player.hp}/{player.max_hp}")
+    embed.add_field(name="Gold", value=player.gold)
+    if rank is not None:
+        embed.add_field(name="Rank", value=f"#{rank}")
     return embed 
\ No newline at end of file
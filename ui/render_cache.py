@@ -0,0 +1,56 @@
+from collections import OrderedDict
+
+# Approximate memory budget for cached renders, in characters.
+MAX_CHARS = 4_000_000
+# Rough per-entry cost of the key, the OrderedDict slot and the object itself.
+ENTRY_OVERHEAD = 256
+
+
+class RenderCache:
+    """LRU cache for rendered embeds and message text.
+
+    Keys should include whatever the render depends on -- for per-player
+    renders that is the player's store version, so any change to the record
+    produces a new key and the stale entry simply ages out. Size is tracked
+    as characters (``len`` of a string or a ``discord.Embed``) plus a fixed
+    overhead, and the least recently used entries are evicted past
+    ``max_chars``.
+    """
+
+    def __init__(self, max_chars=MAX_CHARS):
+        self.max_chars = max_chars
+        self._entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, render):
+        """Return the cached value for ``key``, calling ``render()`` on a miss."""
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+        self.misses += 1
+        value = render()
+        cost = len(value) + ENTRY_OVERHEAD
+        self._entries[key] = (value, cost)
+        self.size += cost
+        while self.size > self.max_chars and len(self._entries) > 1:
+            _, (_, old_cost) = self._entries.popitem(last=False)
+            self.size -= old_cost
+            self.evictions += 1
+        return value
+
+    def report(self):
+        total = self.hits + self.misses
+        rate = self.hits / total if total else 0
+        return (f"Render cache: {len(self)} entries, ~{self.size:,} chars, "
+                f"{self.hits}/{total} hits ({rate:.0%}), {self.evictions} evictions")
+
+
+render_cache = RenderCache()
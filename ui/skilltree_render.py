@@ -1,6 +1,11 @@
-def render_skilltree(skills, unlocked):
+def render_skilltree(skills, unlocked, available=()):
     lines = []
     for skill_id, skill in skills.items():
-        status = "✅" if skill_id in unlocked else "❌"
+        if skill_id in unlocked:
+            status = "✅"
+        elif skill_id in available:
+            status = "🔓"
+        else:
+            status = "❌"
         lines.append(f"{status} {skill['name']}: {skill['description']}")
-    return "\n".join(lines) 
\ No newline at end of file
+    return "\n".join(lines)
@@ -19,4 +19,29 @@ class HelpCategoryDropdown(discord.ui.Select):
         self.callback_func = callback
 
     async def callback(self, interaction: discord.Interaction):
-        await self.callback_func(interaction, self.values[0]) 
\ No newline at end of file
+        await self.callback_func(interaction, self.values[0]) 
+
+class PageView(discord.ui.View):
+    """Previous/next buttons flipping one message through a list of embeds."""
+    def __init__(self, pages, index=0, timeout=120):
+        super().__init__(timeout=timeout)
+        self.pages = pages
+        self.index = min(max(index, 0), len(pages) - 1)
+        self.update_buttons()
+
+    def update_buttons(self):
+        self.previous.disabled = self.index == 0
+        self.next.disabled = self.index == len(self.pages) - 1
+
+    async def show(self, interaction, index):
+        self.index = min(max(index, 0), len(self.pages) - 1)
+        self.update_buttons()
+        await interaction.response.edit_message(embed=self.pages[self.index], view=self)
+
+    @discord.ui.button(label="◀", style=discord.ButtonStyle.secondary)
+    async def previous(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self.show(interaction, self.index - 1)
+
+    @discord.ui.button(label="▶", style=discord.ButtonStyle.secondary)
+    async def next(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self.show(interaction, self.index + 1)
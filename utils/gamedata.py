@@ -0,0 +1,145 @@
+import json
+import os
+import time
+from collections import Counter
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '../data')
+TABLES = ("items", "classes", "skills", "dungeons", "achievements", "titles", "recipes")
+# Seconds between mtime checks for a table; lookups in between are served from memory.
+CHECK_INTERVAL = 2.0
+
+
+def _index_skills(skills):
+    return {"skill_by_name": {skill["name"]: skill_id for skill_id, skill in skills.items() if "name" in skill}}
+
+
+def _index_titles(titles):
+    by_requirement = {}
+    for title_id, title in titles.items():
+        if title.get("requirement"):
+            by_requirement.setdefault(title["requirement"], []).append(title_id)
+    return {"titles_by_achievement": by_requirement}
+
+
+INDEXERS = {
+    "skills": _index_skills,
+    "titles": _index_titles,
+}
+
+
+class GameData:
+    """Read-only cache of the static JSON tables in ``data/``.
+
+    Each table is parsed once and reparsed only when its file's mtime changes.
+    Reverse indexes are rebuilt together with their table, and other modules
+    can register ``on_reload`` callbacks to rebuild derived data of their own.
+    Missing files load as empty tables.
+    """
+
+    def __init__(self, data_dir=DATA_DIR, check_interval=CHECK_INTERVAL):
+        self.data_dir = data_dir
+        self.check_interval = check_interval
+        self._tables = {}
+        self._mtimes = {}
+        self._checked = {}
+        self._indexes = {}
+        self._listeners = {}
+        self.reloads = Counter()
+        self.hits = Counter()
+        self.misses = Counter()
+
+    def path(self, name):
+        return os.path.join(self.data_dir, f"{name}.json")
+
+    def table(self, name):
+        now = time.monotonic()
+        if name not in self._tables or now - self._checked.get(name, 0) >= self.check_interval:
+            self._checked[name] = now
+            self._refresh(name)
+        return self._tables[name]
+
+    def _refresh(self, name):
+        try:
+            mtime = os.stat(self.path(name)).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        if name in self._tables and self._mtimes.get(name) == mtime:
+            return
+        if mtime is None:
+            data = {}
+        else:
+            with open(self.path(name), 'r') as f:
+                data = json.load(f)
+        self._tables[name] = data
+        self._mtimes[name] = mtime
+        self.reloads[name] += 1
+        if name in INDEXERS:
+            self._indexes.update(INDEXERS[name](data))
+        for callback in self._listeners.get(name, ()):
+            callback(data)
+
+    def warm(self):
+        """Load every table up front so the first command doesn't pay for it."""
+        for name in TABLES:
+            self.table(name)
+
+    def on_reload(self, name, callback):
+        """Call ``callback(table)`` now and whenever ``name`` is reloaded."""
+        self._listeners.setdefault(name, []).append(callback)
+        if name in self._tables:
+            callback(self._tables[name])
+
+    def _lookup(self, table, index, key, default=None):
+        self.table(table)
+        value = self._indexes[index].get(key, default)
+        if value is default:
+            self.misses[index] += 1
+        else:
+            self.hits[index] += 1
+        return value
+
+    @property
+    def items(self):
+        return self.table("items")
+
+    @property
+    def classes(self):
+        return self.table("classes")
+
+    @property
+    def skills(self):
+        return self.table("skills")
+
+    @property
+    def dungeons(self):
+        return self.table("dungeons")
+
+    @property
+    def achievements(self):
+        return self.table("achievements")
+
+    @property
+    def titles(self):
+        return self.table("titles")
+
+    @property
+    def recipes(self):
+        return self.table("recipes")
+
+    def skill_id_by_name(self, name):
+        return self._lookup("skills", "skill_by_name", name)
+
+    def titles_for_achievement(self, achievement_id):
+        return self._lookup("titles", "titles_by_achievement", achievement_id, ())
+
+    def report(self):
+        lines = []
+        for name in TABLES:
+            lines.append(f"{name}: {len(self._tables.get(name, ()))} entries, {self.reloads[name]} loads")
+        for index in sorted(set(self.hits) | set(self.misses)):
+            total = self.hits[index] + self.misses[index]
+            lines.append(f"{index}: {self.hits[index]}/{total} hits ({self.hits[index] / total:.0%})")
+        return "\n".join(lines)
+
+
+game_data = GameData()
@@ -0,0 +1,55 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+
+class _Entry:
+    __slots__ = ("lock", "users")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.users = 0
+
+
+class PlayerLocks:
+    """Async locks keyed by player id.
+
+    A lock only exists while some task holds or waits on it, so memory is
+    proportional to the players with commands in flight. Multi-player holds
+    acquire in sorted id order, so two commands locking the same pair can
+    never deadlock, and commands for unrelated players never wait on each
+    other.
+    """
+
+    def __init__(self):
+        self._entries = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def is_locked(self, user_id):
+        entry = self._entries.get(str(user_id))
+        return entry is not None and entry.lock.locked()
+
+    @asynccontextmanager
+    async def hold(self, *user_ids):
+        keys = sorted({str(uid) for uid in user_ids})
+        entries = []
+        for key in keys:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = _Entry()
+            entry.users += 1
+            entries.append((key, entry))
+        acquired = []
+        try:
+            for key, entry in entries:
+                await entry.lock.acquire()
+                acquired.append(entry)
+            yield
+        finally:
+            for entry in reversed(acquired):
+                entry.lock.release()
+            for key, entry in entries:
+                entry.users -= 1
+                if entry.users == 0:
+                    del self._entries[key]
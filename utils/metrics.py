@@ -0,0 +1,203 @@
+"""Hot-path instrumentation: latency histograms and Discord API call counters.
+
+Off by default (``config.METRICS_ENABLED``). While off, ``timer`` hands back
+a shared no-op context manager and ``observe`` returns immediately, and no
+hooks are installed, so instrumented code pays one attribute check.
+
+``install(bot)`` turns it on:
+
+* every command is timed from ``before_invoke`` to ``after_invoke``;
+* REST requests made through ``bot.http`` and interaction responses (which
+  go through discord.py's webhook adapter) are counted per command;
+* a background task writes all series in Prometheus text format to
+  ``config.METRICS_FILE`` every ``config.METRICS_INTERVAL`` seconds.
+
+Storage and view-wait timings are recorded where they happen, with
+``metrics.timer(family, label)`` / ``metrics.observe(family, label, seconds)``.
+"""
+import asyncio
+import bisect
+import contextvars
+import os
+import time
+from collections import Counter
+from contextlib import nullcontext
+
+import config
+
+METRICS_FILE = os.path.join(os.path.dirname(__file__), '../data/metrics.prom')
+
+# Histogram bucket upper bounds, in seconds.
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Prometheus metric name and label name per histogram family.
+FAMILIES = {
+    "command": ("plagg_command_latency_seconds", "command"),
+    "storage": ("plagg_storage_seconds", "op"),
+    "view_wait": ("plagg_view_wait_seconds", "command"),
+}
+
+NO_COMMAND = "(none)"
+_current_command = contextvars.ContextVar("current_command", default=NO_COMMAND)
+_NULL_TIMER = nullcontext()
+
+
+class Histogram:
+    """Fixed-bucket latency histogram."""
+
+    __slots__ = ("counts", "count", "sum")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the ``q`` quantile (``inf`` past the last bucket)."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, n in zip(BUCKETS, self.counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+
+class _Timer:
+    __slots__ = ("histogram", "start")
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start)
+
+
+class Metrics:
+    def __init__(self):
+        self.enabled = False
+        self.histograms = {}
+        self.api_calls = Counter()
+        self.errors = Counter()
+        self._task = None
+
+    def _histogram(self, family, label):
+        histogram = self.histograms.get((family, label))
+        if histogram is None:
+            histogram = self.histograms[family, label] = Histogram()
+        return histogram
+
+    def timer(self, family, label=None):
+        """Context manager timing its body into ``family``; ``label`` defaults to the current command."""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self._histogram(family, label or _current_command.get()))
+
+    def observe(self, family, label, seconds):
+        if self.enabled:
+            self._histogram(family, label).observe(seconds)
+
+    def install(self, bot):
+        """Enable collection, hook every command and API call, and start the file writer."""
+        if self.enabled:
+            return
+        self.enabled = True
+        bot.before_invoke(self._before_invoke)
+        bot.after_invoke(self._after_invoke)
+        bot.http.request = self._counting(bot.http.request)
+        from discord.webhook.async_ import async_context
+        adapter = async_context.get()
+        adapter.request = self._counting(adapter.request)
+        self._task = asyncio.get_running_loop().create_task(self._write_loop())
+
+    def _counting(self, request):
+        async def counted(*args, **kwargs):
+            self.api_calls[_current_command.get()] += 1
+            return await request(*args, **kwargs)
+        return counted
+
+    async def _before_invoke(self, ctx):
+        _current_command.set(ctx.command.qualified_name)
+        ctx.metrics_started = time.perf_counter()
+
+    async def _after_invoke(self, ctx):
+        name = ctx.command.qualified_name
+        self._histogram("command", name).observe(time.perf_counter() - ctx.metrics_started)
+        if ctx.command_failed:
+            self.errors[name] += 1
+
+    def prometheus(self):
+        """All series in Prometheus text exposition format."""
+        lines = []
+        for family, (metric, label_name) in FAMILIES.items():
+            series = sorted((label, h) for (fam, label), h in self.histograms.items() if fam == family)
+            if not series:
+                continue
+            lines.append(f"# TYPE {metric} histogram")
+            for label, histogram in series:
+                cumulative = 0
+                for bound, n in zip(BUCKETS + (float("inf"),), histogram.counts):
+                    cumulative += n
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f'{metric}_bucket{{{label_name}="{label}",le="{le}"}} {cumulative}')
+                lines.append(f'{metric}_sum{{{label_name}="{label}"}} {histogram.sum:.6f}')
+                lines.append(f'{metric}_count{{{label_name}="{label}"}} {histogram.count}')
+        for metric, counter in (("plagg_discord_api_calls_total", self.api_calls),
+                                ("plagg_command_errors_total", self.errors)):
+            if counter:
+                lines.append(f"# TYPE {metric} counter")
+                lines.extend(f'{metric}{{command="{name}"}} {n}' for name, n in sorted(counter.items()))
+        return "\n".join(lines) + "\n"
+
+    def write(self, path=None):
+        path = path or config.METRICS_FILE or METRICS_FILE
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(self.prometheus())
+        os.replace(tmp_path, path)
+
+    async def _write_loop(self):
+        while True:
+            await asyncio.sleep(config.METRICS_INTERVAL)
+            try:
+                await asyncio.to_thread(self.write)
+            except OSError as e:
+                print(f"Failed to write metrics: {e}")
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+            await asyncio.to_thread(self.write)
+
+    def report(self):
+        """Per-command summary for the ``!metrics`` command."""
+        if not self.enabled:
+            return "Metrics are off. Set METRICS_ENABLED = True in config.py."
+        lines = [f"{'command':<14} {'calls':>6} {'p50 ms':>8} {'p99 ms':>8} {'avg ms':>8} {'api/cmd':>8} {'errors':>6}"]
+        for (family, name), h in sorted(self.histograms.items()):
+            if family != "command":
+                continue
+            lines.append(f"{name:<14} {h.count:>6} {h.quantile(0.5) * 1e3:>8.1f} {h.quantile(0.99) * 1e3:>8.1f} "
+                         f"{h.sum / h.count * 1e3:>8.1f} {self.api_calls[name] / h.count:>8.1f} {self.errors[name]:>6}")
+        for family in ("storage", "view_wait"):
+            for (fam, label), h in sorted(self.histograms.items()):
+                if fam == family and h.count:
+                    lines.append(f"{family}:{label:<14} n={h.count} p50={h.quantile(0.5) * 1e3:.1f}ms "
+                                 f"p99={h.quantile(0.99) * 1e3:.1f}ms avg={h.sum / h.count * 1e3:.1f}ms")
+        if self.api_calls[NO_COMMAND]:
+            lines.append(f"API calls outside commands: {self.api_calls[NO_COMMAND]}")
+        return "\n".join(lines)
+
+
+metrics = Metrics()
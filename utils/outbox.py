@@ -0,0 +1,263 @@
+"""Outbound message scheduler.
+
+Every message a command sends goes through the bot's ``Outbox`` (cogs get
+an ``OutboxContext``, whose ``send`` is routed here). Messages queue per
+channel and per route (sends and edits have separate Discord buckets), and
+each queue is drained by one task that waits on a local copy of Discord's
+rate-limit bucket, so bursts are spread out instead of answered
+with 429s. A global bucket covers the bot-wide request limit. When a
+channel has nothing queued and room in its buckets, the call goes straight
+out without a queue hop.
+
+``ctx.say(text)`` queues an informational line without waiting for it.
+Consecutive queued lines for the same channel are merged into one message
+(up to Discord's 2000 characters), so a command that narrates several
+steps costs one send. ``ctx.send`` still returns its own message and is
+never merged, but waits behind queued lines so ordering is kept.
+
+Interaction responses must arrive within three seconds and don't count
+against the channel buckets: ``respond`` counts against the global bucket
+at once, ahead of any message waiting on it.
+"""
+import asyncio
+import time
+from collections import Counter, deque
+
+from discord.ext import commands
+
+import config
+
+# Discord rejects message content longer than this.
+MAX_CONTENT = 2000
+# Idle channel queues are dropped once more than this many exist.
+PRUNE_ROUTES = 1000
+
+
+class Bucket:
+    """Fixed window of ``limit`` requests per ``per`` seconds, counted the way Discord does.
+
+    A window opens with its first request and runs for ``per`` seconds from
+    that request's response (Discord's reset-after is measured from when it
+    handled the request, which a local clock only knows after the reply). A
+    ``limit`` of 0 never waits.
+    """
+
+    __slots__ = ("limit", "per", "used", "reset_at")
+
+    def __init__(self, limit, per):
+        self.limit = limit
+        self.per = per
+        self.used = 0
+        self.reset_at = 0.0
+
+    def delay(self):
+        """Seconds until a request may be made (0 if one may be made now)."""
+        if not self.limit:
+            return 0.0
+        now = time.monotonic()
+        if now >= self.reset_at:
+            self.used = 0
+        return 0.0 if self.used < self.limit else self.reset_at - now
+
+    def take(self):
+        """Count a request, even past the limit; later waiters then wait for the next window."""
+        if not self.limit:
+            return
+        now = time.monotonic()
+        if now >= self.reset_at:
+            self.used = 0
+        if self.used == 0:
+            self.reset_at = now + self.per
+        self.used += 1
+
+    def answered(self):
+        """Time the window from now if the request just answered was the one that opened it."""
+        if self.used == 1:
+            self.reset_at = time.monotonic() + self.per
+
+    def is_idle(self):
+        return time.monotonic() >= self.reset_at
+
+
+class _Message:
+    __slots__ = ("call", "args", "kwargs", "text", "future")
+
+    def __init__(self, call, args, kwargs, text=None, future=None):
+        self.call = call
+        self.args = args
+        self.kwargs = kwargs
+        # Set for ``say`` lines, which may be merged with their neighbours.
+        self.text = text
+        self.future = future
+
+
+class _Route:
+    __slots__ = ("queue", "bucket", "task", "busy")
+
+    def __init__(self, limit, per):
+        self.queue = deque()
+        self.bucket = Bucket(limit, per)
+        self.task = None
+        # True while a call made straight from ``_call`` is in flight.
+        self.busy = False
+
+
+class Outbox:
+    """Per-channel message queues with local rate limits; see the module docstring.
+
+    ``limit``/``per``/``global_limit`` default to the ``OUTBOX_*`` settings in
+    config.py; a limit of 0 turns that bucket off.
+    """
+
+    def __init__(self, limit=None, per=None, global_limit=None):
+        self.limit = config.OUTBOX_CHANNEL_LIMIT if limit is None else limit
+        self.per = config.OUTBOX_CHANNEL_PER if per is None else per
+        self.global_bucket = Bucket(config.OUTBOX_GLOBAL_LIMIT if global_limit is None else global_limit, 1.0)
+        self.routes = {}
+        # sent, edited, responded, merged (sends avoided), waited (calls delayed by a bucket), failed
+        self.stats = Counter()
+        self.wait_seconds = 0.0
+
+    @property
+    def depth(self):
+        """Messages queued and not yet handed to Discord."""
+        return sum(len(route.queue) for route in self.routes.values())
+
+    def _route(self, kind, channel_id):
+        route = self.routes.get((kind, channel_id))
+        if route is None:
+            if len(self.routes) >= PRUNE_ROUTES:
+                self._prune()
+            route = self.routes[kind, channel_id] = _Route(self.limit, self.per)
+        return route
+
+    def _prune(self):
+        for key, route in list(self.routes.items()):
+            if route.task is None and not route.busy and route.bucket.is_idle():
+                del self.routes[key]
+
+    def _enqueue(self, kind, route, message):
+        route.queue.append(message)
+        if route.task is None and not route.busy:
+            route.task = asyncio.get_running_loop().create_task(self._drain(kind, route))
+
+    async def _call(self, kind, channel_id, call, args, kwargs):
+        route = self._route(kind, channel_id)
+        if route.busy or route.task is not None or route.bucket.delay() or self.global_bucket.delay():
+            future = asyncio.get_running_loop().create_future()
+            self._enqueue(kind, route, _Message(call, args, kwargs, future=future))
+            return await future
+        # Nothing queued and both buckets have room: call straight away, skipping the drain task.
+        route.busy = True
+        route.bucket.take()
+        self.global_bucket.take()
+        try:
+            result = await call(*args, **kwargs)
+            route.bucket.answered()
+        except Exception:
+            self.stats["failed"] += 1
+            raise
+        finally:
+            route.busy = False
+            if route.queue and route.task is None:
+                route.task = asyncio.get_running_loop().create_task(self._drain(kind, route))
+        self.stats["sent" if kind == "send" else "edited"] += 1
+        return result
+
+    async def send(self, channel, send, *args, **kwargs):
+        """Call ``send(*args, **kwargs)`` once ``channel``'s queue and buckets allow it; returns its result."""
+        return await self._call("send", channel.id, send, args, kwargs)
+
+    def say(self, channel, send, text):
+        """Queue ``text`` for ``channel`` via ``send(text)`` and return at once; may be merged."""
+        self._enqueue("send", self._route("send", channel.id), _Message(send, (), {}, text=text))
+
+    async def edit(self, message, **kwargs):
+        """Edit ``message`` once the channel's edit bucket allows it; returns the edited message."""
+        return await self._call("edit", message.channel.id, message.edit, (), kwargs)
+
+    async def respond(self, respond, *args, **kwargs):
+        """Answer an interaction now, ahead of any message waiting on the global bucket."""
+        self.global_bucket.take()
+        self.stats["responded"] += 1
+        return await respond(*args, **kwargs)
+
+    def _merge(self, route, first):
+        """Fold the ``say`` lines queued right after ``first`` into it."""
+        lines, length = [first.text], len(first.text)
+        queue = route.queue
+        while queue and queue[0].text is not None and length + 1 + len(queue[0].text) <= MAX_CONTENT:
+            text = queue.popleft().text
+            lines.append(text)
+            length += 1 + len(text)
+        self.stats["merged"] += len(lines) - 1
+        return "\n".join(lines)
+
+    async def _wait(self, bucket):
+        delay = bucket.delay()
+        if delay:
+            self.stats["waited"] += 1
+        while delay:
+            self.wait_seconds += delay
+            await asyncio.sleep(delay)
+            delay = bucket.delay()
+        bucket.take()
+
+    async def _drain(self, kind, route):
+        try:
+            while route.queue:
+                await self._wait(route.bucket)
+                await self._wait(self.global_bucket)
+                message = route.queue.popleft()
+                args = message.args if message.text is None else (self._merge(route, message),)
+                try:
+                    result = await message.call(*args, **message.kwargs)
+                    route.bucket.answered()
+                except Exception as e:
+                    self.stats["failed"] += 1
+                    if message.future is None:
+                        print(f"Failed to deliver message: {e}")
+                    elif not message.future.done():
+                        message.future.set_exception(e)
+                    continue
+                self.stats["sent" if kind == "send" else "edited"] += 1
+                if message.future is not None and not message.future.done():
+                    message.future.set_result(result)
+        finally:
+            route.task = None
+
+    async def close(self, timeout=10):
+        """Give queued messages up to ``timeout`` seconds to go out."""
+        tasks = [route.task for route in self.routes.values() if route.task is not None]
+        if tasks:
+            await asyncio.wait(tasks, timeout=timeout)
+
+    def report(self):
+        """Summary for the ``!outbox`` command and health reports."""
+        stats = self.stats
+        return (f"Queued: {self.depth} in {sum(1 for r in self.routes.values() if r.queue)} channel(s)\n"
+                f"Sent: {stats['sent']}, edited: {stats['edited']}, interaction responses: {stats['responded']}\n"
+                f"Sends avoided by merging: {stats['merged']}\n"
+                f"Delayed by rate limits: {stats['waited']} ({self.wait_seconds:.1f}s total), failed: {stats['failed']}")
+
+
+def get_outbox(bot):
+    """Return the bot's Outbox, creating it on first use."""
+    outbox = getattr(bot, 'outbox', None)
+    if outbox is None:
+        outbox = bot.outbox = Outbox()
+    return outbox
+
+
+class OutboxContext(commands.Context):
+    """Command context whose messages go through the bot's Outbox."""
+
+    async def send(self, content=None, **kwargs):
+        if self.interaction is not None:
+            # Slash invocations answer their interaction rather than posting to the channel.
+            return await get_outbox(self.bot).respond(super().send, content, **kwargs)
+        return await get_outbox(self.bot).send(self.channel, super().send, content, **kwargs)
+
+    async def say(self, content):
+        """Queue a plain-text line without waiting; consecutive lines are sent as one message."""
+        get_outbox(self.bot).say(self.channel, super().send, content)